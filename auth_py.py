@@ -1,10 +1,24 @@
 import streamlit as st
 import hashlib
-import json
+import hmac
 import os
 import random
 import string
 import datetime
+from concurrent.futures import ThreadPoolExecutor
+from config_py import PASSWORD_HASH_ITERATIONS
+from storage_py import create_storage
+from user_store_py import SharedUserStore
+
+@st.cache_resource
+def get_storage():
+    """Get the configured storage backend, shared by all sessions"""
+    return create_storage()
+
+@st.cache_resource
+def get_user_store():
+    """Get the process-wide user store, shared by all sessions"""
+    return SharedUserStore(get_storage())
 
 # Functions for authentication and user management
 def generate_random_password():
@@ -13,27 +27,65 @@ def generate_random_password():
     return ''.join(random.choice(chars) for _ in range(8))
 
 def hash_password(password):
-    """Hash a password for storing"""
-    return hashlib.sha256(str.encode(password)).hexdigest()
+    """Hash a password for storing, using salted PBKDF2"""
+    salt = os.urandom(16)
+    digest = hashlib.pbkdf2_hmac('sha256', str.encode(password), salt, PASSWORD_HASH_ITERATIONS)
+    return f"pbkdf2_sha256${PASSWORD_HASH_ITERATIONS}${salt.hex()}${digest.hex()}"
+
+def verify_password(password, stored_hash):
+    """Check a password against a stored hash in constant time"""
+    if stored_hash.startswith('pbkdf2_sha256$'):
+        _, iterations, salt, digest = stored_hash.split('$')
+        candidate = hashlib.pbkdf2_hmac('sha256', str.encode(password), bytes.fromhex(salt), int(iterations)).hex()
+        return hmac.compare_digest(candidate, digest)
+    
+    # Hashes created before the switch to PBKDF2 are plain SHA-256
+    return hmac.compare_digest(hashlib.sha256(str.encode(password)).hexdigest(), stored_hash)
+
+def needs_rehash(stored_hash):
+    """Check whether a stored hash predates the current hashing scheme"""
+    return not stored_hash.startswith(f"pbkdf2_sha256${PASSWORD_HASH_ITERATIONS}$")
 
 def init_users():
-    """Initialize the users dictionary in session state"""
-    if 'users' not in st.session_state:
-        # Check if users.json exists
-        if os.path.exists('users.json'):
-            with open('users.json', 'r') as f:
-                st.session_state.users = json.load(f)
-        else:
-            st.session_state.users = {}
+    """Point the session's users dictionary at the shared user store"""
+    store = get_user_store()
+    st.session_state.users = store.users
+    
+    # Report failures of saves that were written in the background
+    for error in store.take_write_errors():
+        st.error(f"Error saving user data: {str(error)}")
 
 def save_users():
-    """Save the users dictionary to a JSON file"""
+    """Save the whole users dictionary to storage"""
+    try:
+        get_user_store().save_all()
+    except Exception as e:
+        st.error(f"Error saving user data: {str(e)}")
+
+def save_user(username):
+    """Save a single user record to storage"""
     try:
-        with open('users.json', 'w') as f:
-            json.dump(st.session_state.users, f)
+        get_user_store().save_user(username)
     except Exception as e:
         st.error(f"Error saving user data: {str(e)}")
 
+def save_project(username, project_id, changes=None):
+    """Save a single project, or only its changed records, and return its new version"""
+    try:
+        return get_user_store().save_project(username, project_id, changes)
+    except Exception as e:
+        st.error(f"Error saving project data: {str(e)}")
+        return None
+
+def save_projects(username, project_ids):
+    """Save several projects of a user in one batched write"""
+    try:
+        get_user_store().save_projects(username, project_ids)
+        return True
+    except Exception as e:
+        st.error(f"Error saving project data: {str(e)}")
+        return False
+
 def user_exists(username):
     """Check if a user exists"""
     return username in st.session_state.users
@@ -49,16 +101,18 @@ def create_project(username, project_name):
     project_id = ''.join(random.choice(string.ascii_lowercase + string.digits) for _ in range(10))
     
     # Store hashed passwords
-    st.session_state.users[username]['projects'][project_id] = {
-        'name': project_name,
-        'edit_password': hash_password(edit_password),
-        'view_password': hash_password(view_password),
-        'created_at': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        'tasks': [],
-        'milestones': []
-    }
-    
-    save_users()
+    with get_user_store().lock(username):
+        st.session_state.users[username]['projects'][project_id] = {
+            'name': project_name,
+            'edit_password': hash_password(edit_password),
+            'view_password': hash_password(view_password),
+            'created_at': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'tasks': [],
+            'milestones': []
+        }
+        get_user_store().catalog(username).add(project_id, st.session_state.users[username]['projects'][project_id])
+        
+        save_project(username, project_id)
     
     return True, {
         'project_id': project_id,
@@ -66,6 +120,51 @@ def create_project(username, project_name):
         'view_password': view_password
     }
 
+def create_projects(username, plans):
+    """Create several projects with their tasks and milestones, saving them in one batched write
+    
+    plans is a list of dictionaries with 'name', 'tasks' and 'milestones'.
+    Returns the credentials of each new project, in the same order.
+    """
+    if username not in st.session_state.users:
+        return False, "User does not exist"
+    
+    passwords = [generate_random_password() for _ in range(2 * len(plans))]
+    
+    # PBKDF2 releases the GIL, so the password hashes are computed in parallel
+    with ThreadPoolExecutor() as pool:
+        hashes = list(pool.map(hash_password, passwords))
+    
+    store = get_user_store()
+    created_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    credentials = []
+    with store.lock(username):
+        projects = st.session_state.users[username]['projects']
+        for index, plan in enumerate(plans):
+            project_id = ''.join(random.choice(string.ascii_lowercase + string.digits) for _ in range(10))
+            while project_id in projects:
+                project_id = ''.join(random.choice(string.ascii_lowercase + string.digits) for _ in range(10))
+            
+            projects[project_id] = {
+                'name': plan['name'],
+                'edit_password': hashes[2 * index],
+                'view_password': hashes[2 * index + 1],
+                'created_at': created_at,
+                'tasks': plan['tasks'],
+                'milestones': plan['milestones']
+            }
+            store.catalog(username).add(project_id, projects[project_id])
+            credentials.append({
+                'project_id': project_id,
+                'edit_password': passwords[2 * index],
+                'view_password': passwords[2 * index + 1]
+            })
+        
+        if not save_projects(username, [entry['project_id'] for entry in credentials]):
+            return False, "Error saving projects"
+    
+    return True, credentials
+
 def authenticate_project(username, project_id, password, mode='edit'):
     """Authenticate a user for a project"""
     if username not in st.session_state.users:
@@ -74,30 +173,42 @@ def authenticate_project(username, project_id, password, mode='edit'):
     if project_id not in st.session_state.users[username]['projects']:
         return False, "Project does not exist"
     
-    hashed_password = hash_password(password)
+    project = st.session_state.users[username]['projects'][project_id]
     
-    if mode == 'edit' and st.session_state.users[username]['projects'][project_id]['edit_password'] == hashed_password:
+    if mode == 'edit' and verify_password(password, project['edit_password']):
+        _upgrade_project_hash(username, project_id, 'edit_password', password)
         return True, "Authentication successful"
-    elif mode == 'view' and st.session_state.users[username]['projects'][project_id]['view_password'] == hashed_password:
+    elif mode == 'view' and verify_password(password, project['view_password']):
+        _upgrade_project_hash(username, project_id, 'view_password', password)
         return True, "Authentication successful"
-    elif mode == 'view' and st.session_state.users[username]['projects'][project_id]['edit_password'] == hashed_password:
+    elif mode == 'view' and verify_password(password, project['edit_password']):
         # Edit password can also be used to view
+        _upgrade_project_hash(username, project_id, 'edit_password', password)
         return True, "Authentication successful"
     
     return False, "Incorrect password"
 
+def _upgrade_project_hash(username, project_id, field, password):
+    """Re-hash a project password stored with an outdated scheme"""
+    project = st.session_state.users[username]['projects'][project_id]
+    if needs_rehash(project[field]):
+        with get_user_store().lock(username):
+            project[field] = hash_password(password)
+            save_project(username, project_id, {'meta': True})
+
 def register_user(username, password):
     """Register a new user"""
-    if user_exists(username):
-        return False, "Username already exists"
-    
-    st.session_state.users[username] = {
-        'password': hash_password(password),
-        'created_at': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        'projects': {}
-    }
-    
-    save_users()
+    with get_user_store().lock(username):
+        if user_exists(username):
+            return False, "Username already exists"
+        
+        st.session_state.users[username] = {
+            'password': hash_password(password),
+            'created_at': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'projects': {}
+        }
+        
+        save_user(username)
     
     return True, "User registered successfully"
 
@@ -106,7 +217,13 @@ def login_user(username, password):
     if not user_exists(username):
         return False, "User does not exist"
     
-    if st.session_state.users[username]['password'] == hash_password(password):
+    user = st.session_state.users[username]
+    if verify_password(password, user['password']):
+        if needs_rehash(user['password']):
+            # Upgrade hashes created with an outdated scheme
+            with get_user_store().lock(username):
+                user['password'] = hash_password(password)
+                save_user(username)
         return True, "Login successful"
     
     return False, "Incorrect password"
@@ -124,4 +241,19 @@ def get_user_projects(username):
             'created_at': project_data['created_at']
         })
     
-    return projects
\ No newline at end of file
+    return projects
+
+def get_project_catalog(username):
+    """Get the indexed project catalog of a user"""
+    if not user_exists(username):
+        return None
+    
+    return get_user_store().catalog(username)
+
+def list_user_projects(username, page=1, page_size=20, sort='name', descending=False, prefix=''):
+    """Get one page of a user's projects and the total number of matches"""
+    catalog = get_project_catalog(username)
+    if catalog is None:
+        return [], 0
+    
+    return catalog.page(page, page_size, sort=sort, descending=descending, prefix=prefix)
@@ -0,0 +1,92 @@
+import io
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config_py import IMPORT_WORKERS
+from importers_py import get_importer
+from upload_cache_py import get_upload_cache, parsed_size
+
+# Functions for batch import of project plans
+def collect_plan_files(uploaded_files):
+    """Expand uploaded plans and zip archives of plans into (file name, bytes) pairs
+
+    Returns the files that can be imported and the names of those that were
+    skipped because no importer handles them.
+    """
+    files = []
+    skipped = []
+    for upload in uploaded_files:
+        data = upload.getvalue()
+        if not upload.name.lower().endswith('.zip'):
+            if get_importer(upload.name) is None:
+                skipped.append(upload.name)
+            else:
+                files.append((upload.name, data))
+            continue
+
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            for info in archive.infolist():
+                name = os.path.basename(info.filename)
+                # Skip folders and the metadata files some archivers add
+                if info.is_dir() or not name or name.startswith('.') or info.filename.startswith('__MACOSX/'):
+                    continue
+                if get_importer(name) is None:
+                    skipped.append(info.filename)
+                else:
+                    files.append((info.filename, archive.read(info)))
+
+    return files, skipped
+
+def parse_plan_file(filename, data):
+    """Parse one plan file into tasks, milestones and warnings; runs in a worker process"""
+    parse, _ = get_importer(filename)
+    return parse(data)
+
+def parse_plan_files(files, max_workers=IMPORT_WORKERS, progress=None):
+    """Parse plan files concurrently in a pool of worker processes
+
+    Files already in the upload cache are not parsed again. Returns one
+    (file name, parsed result, error) entry per file, in input order, and
+    calls progress(files_done, files_total, file_name) as each file finishes.
+    """
+    cache = get_upload_cache()
+    results = [None] * len(files)
+    keys = {}
+    for index, (filename, data) in enumerate(files):
+        keys[index] = cache.key(data, get_importer(filename)[1])
+        parsed = cache.get(keys[index])
+        if parsed is not None:
+            results[index] = (filename, parsed, None)
+
+    pending = [index for index, result in enumerate(results) if result is None]
+    done = len(files) - len(pending)
+    if progress and done:
+        progress(done, len(files), "cached files")
+    if not pending:
+        return results
+
+    # Worker processes are spawned rather than forked, as the app process runs other threads
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(pending)), mp_context=context) as pool:
+        futures = {pool.submit(parse_plan_file, *files[index]): index for index in pending}
+        for future in as_completed(futures):
+            index = futures[future]
+            filename = files[index][0]
+            try:
+                parsed = future.result()
+                cache.put(keys[index], parsed, parsed_size(parsed))
+                results[index] = (filename, parsed, None)
+            except Exception as e:
+                results[index] = (filename, None, str(e))
+
+            done += 1
+            if progress:
+                progress(done, len(files), filename)
+
+    return results
+
+def project_name_for(filename):
+    """Derive a project name from a plan's file name"""
+    return os.path.splitext(os.path.basename(filename))[0]
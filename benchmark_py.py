@@ -0,0 +1,284 @@
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add the current directory to the path so Python can find our modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from storage_py import JsonStorage, SQLiteStorage, JournalStorage
+from snapshot_py import encode_snapshot, decode_snapshot
+
+# Helpers for building synthetic project data
+def make_task(index):
+    """Create a synthetic task record"""
+    return {
+        'id': str(index + 1),
+        'wbs': f"{index // 10 + 1}.{index % 10 + 1}",
+        'title': f"Task {index + 1}",
+        'description': f"Description of task {index + 1}",
+        'dependencies': '',
+        'owner': f"Owner {index % 25}",
+        'completion': f"{(index * 7) % 101}%",
+        'scheduled_start': '01/02/2024',
+        'scheduled_finish': '15/03/2024',
+        'actual_start': '',
+        'actual_finish': '',
+        'finish_variance': '',
+        'duration': str(index % 30 + 1)
+    }
+
+def make_users(task_count, project_count=10):
+    """Create a users dictionary holding task_count tasks spread over several projects"""
+    per_project = max(1, task_count // project_count)
+    projects = {}
+    for p in range(project_count):
+        projects[f"project{p:04d}"] = {
+            'name': f"Project {p}",
+            'edit_password': '',
+            'view_password': '',
+            'created_at': '2024-01-01 00:00:00',
+            'tasks': [make_task(i) for i in range(per_project)],
+            'milestones': []
+        }
+    return {'bench': {'password': '', 'created_at': '2024-01-01 00:00:00', 'projects': projects}}
+
+def timed(func, repeat=5):
+    """Return the best wall-clock time of func over several runs, in milliseconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+# Benchmarks
+def bench_storage(sizes=(10, 1000, 100000)):
+    """Compare the latency of saving a single tracked task edit with each storage backend"""
+    results = []
+    for size in sizes:
+        users = make_users(size)
+        project_id = 'project0000'
+        tasks = users['bench']['projects'][project_id]['tasks']
+
+        with tempfile.TemporaryDirectory() as tmp:
+            backends = {
+                'json': JsonStorage(os.path.join(tmp, 'users.json')),
+                'sqlite': SQLiteStorage(os.path.join(tmp, 'users.db')),
+                'journal': JournalStorage(os.path.join(tmp, 'snapshot.json'), os.path.join(tmp, 'users.journal'))
+            }
+            for name, storage in backends.items():
+                storage.save_users(users)
+
+                def edit_and_save():
+                    tasks[0]['completion'] = f"{int(tasks[0]['completion'].rstrip('%')) % 100 + 1}%"
+                    storage.save_project(users, 'bench', project_id, {'tasks': ([0], len(tasks))})
+
+                results.append((size, name, timed(edit_and_save)))
+
+            backends['sqlite'].close()
+            backends['journal'].wait_for_compaction()
+
+    print(f"{'tasks':>8} {'backend':>8} {'save (ms)':>10}")
+    for size, name, elapsed in results:
+        print(f"{size:>8} {name:>8} {elapsed:>10.2f}")
+    return results
+
+def bench_snapshot(sizes=(1000, 20000)):
+    """Compare the binary snapshot format with JSON for size, encode time and decode time"""
+    results = []
+    for size in sizes:
+        document = {
+            'project_name': 'Benchmark',
+            'tasks': [make_task(i) for i in range(size)],
+            'milestones': []
+        }
+        formats = {
+            'json': (lambda: json.dumps(document), json.loads),
+            'json-indent': (lambda: json.dumps(document, indent=4), json.loads),
+            'snapshot': (lambda: encode_snapshot(document), decode_snapshot)
+        }
+        for name, (encode, decode) in formats.items():
+            encoded = encode()
+            results.append((
+                size, name, len(encoded),
+                timed(encode, repeat=3),
+                timed(lambda: decode(encoded), repeat=3)
+            ))
+
+    print(f"{'tasks':>8} {'format':>12} {'bytes':>12} {'encode (ms)':>12} {'decode (ms)':>12}")
+    for size, name, length, encode_ms, decode_ms in results:
+        print(f"{size:>8} {name:>12} {length:>12} {encode_ms:>12.2f} {decode_ms:>12.2f}")
+    return results
+
+def make_date_column(rows):
+    """Create a column of date strings as found in uploaded plans, mostly in one format"""
+    import datetime
+    start = datetime.date(2020, 1, 1)
+    values = []
+    for i in range(rows):
+        day = start + datetime.timedelta(days=(i * 37) % 3000)
+        if i % 50 == 0:
+            values.append(day.strftime('%Y-%m-%d'))
+        elif i % 997 == 0:
+            values.append('TBC')
+        else:
+            values.append(day.strftime('%d/%m/%Y'))
+    return values
+
+def bench_dates(sizes=(10000, 100000)):
+    """Compare per-cell date parsing with the column-wise parser"""
+    # dates_py needs pandas, so it is only imported when this benchmark runs
+    from dates_py import _parse_date_formats, _parse_date_cached, format_date, parse_date_column, format_date_column
+
+    results = []
+    for size in sizes:
+        values = make_date_column(size)
+
+        def per_cell():
+            return [format_date(_parse_date_formats(value)) for value in values]
+
+        def column_wise():
+            _parse_date_cached.cache_clear()
+            return format_date_column(parse_date_column(values)).tolist()
+
+        if per_cell() != column_wise():
+            raise AssertionError("Column-wise parsing differs from per-cell parsing")
+
+        results.append((size, 'per-cell', timed(per_cell, repeat=1)))
+        results.append((size, 'column', timed(column_wise, repeat=3)))
+
+    print(f"{'rows':>8} {'parser':>10} {'time (ms)':>10}")
+    for size, name, elapsed in results:
+        print(f"{size:>8} {name:>10} {elapsed:>10.2f}")
+    return results
+
+def make_plan_workbook(rows):
+    """Create the bytes of an Excel plan with rows tasks and a milestones sheet"""
+    import pandas as pd
+    from schema_py import TASK_COLUMNS
+    from utils_py import TASK_HEADER_ROW
+
+    tasks = []
+    for i in range(rows):
+        task = make_task(i)
+        tasks.append([
+            task['wbs'], task['title'], task['description'], None if i % 3 else 'A.1', task['owner'],
+            task['completion'], task['scheduled_start'], task['scheduled_finish'], None, None, None, int(task['duration'])
+        ])
+    milestones = [[f"Milestone {i}", '01/02/2024', '15/03/2024', 'Yes' if i % 2 else None] for i in range(max(rows // 100, 1))]
+
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        pd.DataFrame(tasks, columns=TASK_COLUMNS).to_excel(writer, sheet_name='Tasks', startrow=TASK_HEADER_ROW, index=False)
+        pd.DataFrame(milestones, columns=['Milestones', 'Start Date', 'End Date', 'Key Milestones']).to_excel(writer, sheet_name='Milestones', index=False)
+    return output.getvalue()
+
+def clean_tasks_per_row(tasks_df):
+    """Reference task cleaning loop, one iterrows() row and field at a time"""
+    import pandas as pd
+    from dates_py import format_date, parse_date
+
+    tasks = []
+    for _, row in tasks_df.iterrows():
+        if pd.isna(row['WBS']) or pd.isna(row['TASK TITLE']) or row['WBS'] == 'WBS':
+            continue
+        tasks.append({
+            'id': str(len(tasks) + 1),
+            'wbs': str(row['WBS']),
+            'title': str(row['TASK TITLE']),
+            'description': str(row['TASK DESCRIPTION']) if not pd.isna(row['TASK DESCRIPTION']) else '',
+            'dependencies': str(row['DEPENDENCIES']) if not pd.isna(row['DEPENDENCIES']) else '',
+            'owner': str(row['TASK OWNER']) if not pd.isna(row['TASK OWNER']) else '',
+            'completion': str(row['PCT OF TASK COMPLETE']) if not pd.isna(row['PCT OF TASK COMPLETE']) else '0%',
+            'scheduled_start': format_date(parse_date(str(row['SCHEDULED START']))) if not pd.isna(row['SCHEDULED START']) else '',
+            'scheduled_finish': format_date(parse_date(str(row['SCHEDULED FINISH']))) if not pd.isna(row['SCHEDULED FINISH']) else '',
+            'actual_start': format_date(parse_date(str(row['ACTUAL START']))) if not pd.isna(row['ACTUAL START']) else '',
+            'actual_finish': format_date(parse_date(str(row['ACTUAL FINISH']))) if not pd.isna(row['ACTUAL FINISH']) else '',
+            'finish_variance': str(row['FINISH VARIANCE']) if not pd.isna(row['FINISH VARIANCE']) else '',
+            'duration': str(row['DURATION']) if not pd.isna(row['DURATION']) else ''
+        })
+    return tasks
+
+def bench_import(sizes=(10000, 100000)):
+    """Compare per-row and column-wise cleaning of an uploaded plan, and time whole imports"""
+    import pandas as pd
+    from utils_py import TASK_HEADER_ROW, clean_task_frame, read_excel_frames, read_excel_streaming
+
+    results = []
+    for size in sizes:
+        data = make_plan_workbook(size)
+        tasks_df = pd.read_excel(io.BytesIO(data), sheet_name=0, header=TASK_HEADER_ROW)
+
+        if clean_tasks_per_row(tasks_df) != clean_task_frame(tasks_df)[0]:
+            raise AssertionError("Column-wise cleaning differs from per-row cleaning")
+
+        results.append((size, 'clean per-row', timed(lambda: clean_tasks_per_row(tasks_df), repeat=1)))
+        results.append((size, 'clean column-wise', timed(lambda: clean_task_frame(tasks_df), repeat=3)))
+        results.append((size, 'import pandas', timed(lambda: read_excel_frames(io.BytesIO(data)), repeat=1)))
+        results.append((size, 'import streaming', timed(lambda: read_excel_streaming(io.BytesIO(data)), repeat=1)))
+
+    print(f"{'rows':>8} {'step':>18} {'time (ms)':>10}")
+    for size, name, elapsed in results:
+        print(f"{size:>8} {name:>18} {elapsed:>10.2f}")
+    return results
+
+def make_plan_tasks(rows):
+    """Create tasks of a three-level plan with staggered dates"""
+    import datetime
+    from dates_py import format_date
+
+    start = datetime.date(2024, 1, 1)
+    tasks = []
+    for i in range(rows):
+        task = make_task(i)
+        task['wbs'] = f"{i // 500 + 1}.{i // 25 % 20 + 1}.{i % 25 + 1}"
+        task['scheduled_start'] = format_date(start + datetime.timedelta(days=i % 700))
+        task['scheduled_finish'] = format_date(start + datetime.timedelta(days=i % 700 + i % 30 + 1))
+        tasks.append(task)
+    return tasks
+
+def bench_gantt(sizes=(1000, 10000, 50000)):
+    """Compare the payload and build time of the Plotly Express and level-of-detail Gantt charts
+
+    Time to first paint is approximated by the time to build the figure and
+    serialize it to the JSON sent to the browser.
+    """
+    import numpy as np
+    from task_store_py import TaskStore
+    from visualization_py import create_gantt_chart, create_large_gantt_chart
+
+    results = []
+    for size in sizes:
+        tasks = make_plan_tasks(size)
+        # Every task of the plan, as the Plotly Express chart would draw them
+        leaf_level = int(np.max(TaskStore(tasks).depth))
+        renderers = {
+            'express': lambda: create_gantt_chart(TaskStore(tasks), level=leaf_level),
+            'detail': lambda: create_large_gantt_chart(TaskStore(tasks))
+        }
+        for name, create in renderers.items():
+            payload = len(create().to_json())
+            results.append((size, name, payload, timed(lambda: create().to_json(), repeat=1)))
+
+    print(f"{'tasks':>8} {'renderer':>10} {'bytes':>12} {'build + json (ms)':>18}")
+    for size, name, payload, elapsed in results:
+        print(f"{size:>8} {name:>10} {payload:>12} {elapsed:>18.2f}")
+    return results
+
+BENCHMARKS = {
+    'storage': bench_storage,
+    'snapshot': bench_snapshot,
+    'dates': bench_dates,
+    'import': bench_import,
+    'gantt': bench_gantt
+}
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
@@ -0,0 +1,53 @@
+import threading
+from collections import OrderedDict
+
+# Least recently used cache under a memory budget
+class SizedLRUCache:
+    """Thread-safe cache holding at most max_bytes of entries
+
+    Each entry is stored with a size given by the caller, and the least
+    recently used entries are evicted first to stay within max_bytes.
+    Entries larger than the whole budget are not cached. Cached values are
+    shared between sessions and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key):
+        """Get a cached value, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        """Cache a value, evicting the least recently used entries to stay within max_bytes"""
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        """Drop every cached value"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
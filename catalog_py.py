@@ -0,0 +1,90 @@
+from bisect import bisect_left, insort
+
+# Sort orders supported by ProjectCatalog.page
+SORT_KEYS = ('name', 'created_at')
+
+# Indexed project listing
+class ProjectCatalog:
+    """Index of one user's projects for paginated, sorted and prefix-filtered listing
+
+    Projects are kept in two sorted lists, by case-folded name and by creation
+    date, plus dictionaries for constant-time lookup by ID and by name. The
+    index is updated incrementally as projects are added or renamed.
+    """
+
+    def __init__(self, projects=None):
+        self._by_id = {}
+        self._by_name = {}
+        self._name_index = []
+        self._created_index = []
+        for project_id, project in (projects or {}).items():
+            self._by_id[project_id] = self._entry(project_id, project)
+            self._by_name.setdefault(project['name'], []).append(project_id)
+
+        self._name_index = sorted((entry['name'].casefold(), project_id) for project_id, entry in self._by_id.items())
+        self._created_index = sorted((entry['created_at'], project_id) for project_id, entry in self._by_id.items())
+
+    def __len__(self):
+        return len(self._by_id)
+
+    @staticmethod
+    def _entry(project_id, project):
+        return {'id': project_id, 'name': project['name'], 'created_at': project['created_at']}
+
+    def add(self, project_id, project):
+        """Add a newly created project"""
+        entry = self._entry(project_id, project)
+        self._by_id[project_id] = entry
+        self._by_name.setdefault(entry['name'], []).append(project_id)
+        insort(self._name_index, (entry['name'].casefold(), project_id))
+        insort(self._created_index, (entry['created_at'], project_id))
+
+    def rename(self, project_id, name):
+        """Update the index after a project was renamed"""
+        entry = self._by_id[project_id]
+        if entry['name'] == name:
+            return
+
+        self._name_index.pop(bisect_left(self._name_index, (entry['name'].casefold(), project_id)))
+        ids = self._by_name[entry['name']]
+        ids.remove(project_id)
+        if not ids:
+            del self._by_name[entry['name']]
+
+        entry['name'] = name
+        self._by_name.setdefault(name, []).append(project_id)
+        insort(self._name_index, (name.casefold(), project_id))
+
+    def get(self, project_id):
+        """Look up a project by ID"""
+        return self._by_id.get(project_id)
+
+    def find_by_name(self, name):
+        """Look up the first project with exactly this name"""
+        ids = self._by_name.get(name)
+        return self._by_id[ids[0]] if ids else None
+
+    def page(self, page=1, page_size=20, sort='name', descending=False, prefix=''):
+        """Get one page of projects and the total number of matching projects"""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort}")
+
+        start = max(page - 1, 0) * page_size
+        if prefix:
+            key = prefix.casefold()
+            low = bisect_left(self._name_index, (key,))
+            high = bisect_left(self._name_index, (key + '\U0010ffff',))
+            ids = [project_id for _, project_id in self._name_index[low:high]]
+            if sort == 'created_at':
+                ids.sort(key=lambda project_id: (self._by_id[project_id]['created_at'], project_id))
+            if descending:
+                ids.reverse()
+            return [self._by_id[project_id] for project_id in ids[start:start + page_size]], len(ids)
+
+        index = self._name_index if sort == 'name' else self._created_index
+        total = len(index)
+        if descending:
+            rows = index[max(total - start - page_size, 0):max(total - start, 0)][::-1]
+        else:
+            rows = index[start:start + page_size]
+        return [self._by_id[project_id] for _, project_id in rows], total
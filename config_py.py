@@ -0,0 +1,81 @@
+import os
+
+# Application settings, overridable through environment variables
+
+# Storage backend used for users and projects: 'json', 'sqlite', 'journal' or 'sharded'
+STORAGE_BACKEND = os.environ.get('PM_STORAGE_BACKEND', 'json')
+
+# Location of the single-file JSON store
+USERS_FILE = os.environ.get('PM_USERS_FILE', 'users.json')
+
+# Location of the embedded SQLite database
+SQLITE_FILE = os.environ.get('PM_SQLITE_FILE', 'users.db')
+
+# Append-only change journal used by the 'journal' backend
+JOURNAL_FILE = os.environ.get('PM_JOURNAL_FILE', 'users.journal')
+
+# Journal size in bytes after which it is compacted into a new snapshot
+JOURNAL_COMPACT_BYTES = int(os.environ.get('PM_JOURNAL_COMPACT_BYTES', 4 * 1024 * 1024))
+
+# Index of users and project metadata used by the 'sharded' backend
+SHARD_INDEX_FILE = os.environ.get('PM_SHARD_INDEX_FILE', 'users_index.json')
+
+# Directory holding one tasks and milestones file per project for the 'sharded' backend
+SHARD_DIR = os.environ.get('PM_SHARD_DIR', 'projects')
+
+# Format of the per-project files of the 'sharded' backend: 'json' or 'binary'
+SHARD_FORMAT = os.environ.get('PM_SHARD_FORMAT', 'json')
+
+# Persist saves on a background writer thread instead of the script thread
+ASYNC_WRITES = os.environ.get('PM_ASYNC_WRITES', '0') == '1'
+
+# Seconds the background writer waits to coalesce a burst of saves into one write
+WRITE_COALESCE_SECONDS = float(os.environ.get('PM_WRITE_COALESCE_SECONDS', 0.05))
+
+# PBKDF2 iterations used to hash user and project passwords
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PM_PASSWORD_HASH_ITERATIONS', 200000))
+
+# Secret used to sign session tokens; generated and stored in SESSION_SECRET_FILE when unset
+SESSION_SECRET = os.environ.get('PM_SESSION_SECRET', '')
+SESSION_SECRET_FILE = os.environ.get('PM_SESSION_SECRET_FILE', '.session_secret')
+
+# Lifetime of a session token in seconds
+SESSION_TTL_SECONDS = int(os.environ.get('PM_SESSION_TTL_SECONDS', 12 * 60 * 60))
+
+# Number of distinct date strings remembered by the scalar date parser
+DATE_CACHE_SIZE = int(os.environ.get('PM_DATE_CACHE_SIZE', 65536))
+
+# Number of distinct values sampled to infer the date formats of a column
+DATE_SAMPLE_SIZE = int(os.environ.get('PM_DATE_SAMPLE_SIZE', 200))
+
+# Uploaded workbooks of at least this many bytes are imported with the streaming reader
+STREAMING_IMPORT_BYTES = int(os.environ.get('PM_STREAMING_IMPORT_BYTES', 2 * 1024 * 1024))
+
+# Number of rows converted per batch by the streaming reader
+IMPORT_BATCH_ROWS = int(os.environ.get('PM_IMPORT_BATCH_ROWS', 5000))
+
+# Number of invalid cells of an uploaded plan listed in its import warnings
+IMPORT_ERROR_LIMIT = int(os.environ.get('PM_IMPORT_ERROR_LIMIT', 20))
+
+# Total estimated memory of the parsed uploads kept in memory
+UPLOAD_CACHE_BYTES = int(os.environ.get('PM_UPLOAD_CACHE_BYTES', 256 * 1024 * 1024))
+
+# Total estimated memory of the chart figures kept in memory, counted from the
+# number of traces and data points in each (see FIGURE_TRACE_BYTES and
+# FIGURE_POINT_BYTES in figure_cache_py)
+FIGURE_CACHE_BYTES = int(os.environ.get('PM_FIGURE_CACHE_BYTES', 64 * 1024 * 1024))
+
+# Plans with more tasks than this get the level-of-detail Gantt chart, collapsed to about this many bars
+GANTT_DETAIL_ROWS = int(os.environ.get('PM_GANTT_DETAIL_ROWS', 500))
+
+# Number of bars per page of the level-of-detail Gantt chart
+GANTT_PAGE_ROWS = int(os.environ.get('PM_GANTT_PAGE_ROWS', 100))
+
+# Most time buckets per resource in the utilization heatmap when its granularity is chosen automatically
+UTILIZATION_MAX_COLUMNS = int(os.environ.get('PM_UTILIZATION_MAX_COLUMNS', 260))
+
+# Number of Excel exports kept in memory
+EXPORT_CACHE_ENTRIES = int(os.environ.get('PM_EXPORT_CACHE_ENTRIES', 16))
+
+# Number of worker processes used to parse plans in a batch import
+IMPORT_WORKERS = int(os.environ.get('PM_IMPORT_WORKERS', os.cpu_count() or 1))
@@ -0,0 +1,104 @@
+import datetime
+from functools import lru_cache
+
+import pandas as pd
+from config_py import DATE_CACHE_SIZE, DATE_SAMPLE_SIZE
+
+# Date formats accepted in uploaded plans, in order of preference
+DATE_FORMATS = [
+    '%d/%m/%y', '%d/%m/%Y', '%m/%d/%y', '%m/%d/%Y',
+    '%Y-%m-%d', '%d-%m-%Y', '%m-%d-%Y',
+    '%b %d, %Y', '%B %d, %Y', '%d %b %Y', '%d %B %Y'
+]
+
+def _parse_date_formats(date_str):
+    """Try each date format in turn"""
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(date_str, fmt).date()
+        except ValueError:
+            continue
+
+    # If none of the formats match, return None
+    return None
+
+_parse_date_cached = lru_cache(maxsize=DATE_CACHE_SIZE)(_parse_date_formats)
+
+def parse_date(date_str):
+    """Parse date string in various formats"""
+    if pd.isna(date_str) or date_str == '':
+        return None
+
+    return _parse_date_cached(date_str)
+
+def _first_matching_format(date_str):
+    """Get the index of the first format that parses a date string, or None"""
+    for index, fmt in enumerate(DATE_FORMATS):
+        try:
+            datetime.datetime.strptime(date_str, fmt)
+            return index
+        except ValueError:
+            continue
+    return None
+
+def parse_date_column(values, sample_size=DATE_SAMPLE_SIZE):
+    """Parse a whole column of date strings, giving the same results as parse_date per cell
+
+    The formats needed are inferred from a sample of distinct values. Each of
+    them up to the last one seen in the sample is then applied to the whole
+    column at once, in the same order as parse_date tries them, and only the
+    cells still unparsed afterwards go through the per-cell parser.
+    """
+    series = pd.Series(values, dtype=object)
+    result = pd.Series(None, index=series.index, dtype=object)
+
+    is_text = series.map(lambda value: isinstance(value, str) and value != '').astype(bool)
+    remaining = series[is_text]
+
+    # Infer the formats in use from a sample of distinct values
+    sample = remaining.drop_duplicates().head(sample_size)
+    matches = [index for index in map(_first_matching_format, sample) if index is not None]
+    last_format = max(matches) if matches else -1
+
+    for fmt in DATE_FORMATS[:last_format + 1]:
+        if remaining.empty:
+            break
+
+        # Cells that do not match the format exactly are left for the next one
+        parsed = pd.to_datetime(remaining, format=fmt, exact=True, errors='coerce')
+        parsed = parsed[parsed.notna()]
+        result[parsed.index] = parsed.dt.date
+        remaining = remaining.drop(parsed.index)
+
+    # Outliers fall back to the per-cell parser
+    others = series[~is_text]
+    result[remaining.index] = remaining.map(parse_date)
+    result[others.index] = others.map(parse_date)
+
+    return result
+
+def format_date(date_obj):
+    """Format date object to string"""
+    if date_obj is None:
+        return ''
+
+    return date_obj.strftime('%d/%m/%Y')
+
+def format_date_column(dates):
+    """Format a column of date objects, formatting each distinct date once"""
+    dates = pd.Series(dates, dtype=object)
+    formatted = {date_obj: format_date(date_obj) for date_obj in dates.dropna().unique()}
+    return dates.map(lambda date_obj: formatted.get(date_obj, '') if date_obj is not None else '')
+
+def parse_date_values(values):
+    """Parse a column of cells holding dates or date strings, giving None for cells that are neither"""
+    series = pd.Series(values, dtype=object)
+    result = pd.Series(None, index=series.index, dtype=object)
+
+    present = series.notna()
+    is_date = series.map(lambda value: isinstance(value, datetime.date)).astype(bool) & present
+    result[is_date] = series[is_date].map(lambda value: value.date() if isinstance(value, datetime.datetime) else value)
+
+    text = series[present & ~is_date].map(str)
+    result[text.index] = parse_date_column(text)
+    return result
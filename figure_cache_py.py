@@ -0,0 +1,72 @@
+import numpy as np
+import streamlit as st
+from auth_py import get_user_store
+from cache_py import SizedLRUCache
+from config_py import FIGURE_CACHE_BYTES
+
+# Trace properties holding the data arrays of a figure
+FIGURE_ARRAY_PROPERTIES = ('x', 'y', 'z', 'base', 'text', 'hovertext', 'customdata', 'labels', 'values')
+
+# Estimated bytes per data point, and per trace for its other properties
+FIGURE_POINT_BYTES = 16
+FIGURE_TRACE_BYTES = 1024
+
+# Chart figure cache
+class FigureCache(SizedLRUCache):
+    """Remember chart figures by project version across reruns and sessions
+
+    Entries are keyed by project, version stamp, chart and chart parameters,
+    so a figure is built once per saved state of a project and reused until
+    the project is saved again. Figures are counted by the number of points
+    in their data arrays, which is what their size grows with.
+    """
+
+    def __init__(self, max_bytes=FIGURE_CACHE_BYTES):
+        super().__init__(max_bytes)
+
+    def get_or_build(self, key, build):
+        """Get a cached figure, calling build() only on a miss; build may return None"""
+        entry = self.get(key)
+        if entry is None:
+            figure = build()
+            entry = (figure,)
+            self.put(key, entry, figure_size(figure) if figure is not None else 0)
+        return entry[0]
+
+
+def _point_count(values):
+    """Number of points in a data array, counting each row of a 2D array"""
+    if isinstance(values, str) or not hasattr(values, '__len__'):
+        return 0
+    if isinstance(values, np.ndarray):
+        return values.size
+    if len(values) and isinstance(values[0], (list, tuple, np.ndarray)):
+        return sum(len(row) for row in values)
+    return len(values)
+
+def figure_size(figure):
+    """Estimate the memory a figure takes from the lengths of its trace data arrays"""
+    size = 0
+    for trace in figure.data:
+        points = sum(_point_count(getattr(trace, name, None)) for name in FIGURE_ARRAY_PROPERTIES)
+        size += FIGURE_TRACE_BYTES + points * FIGURE_POINT_BYTES
+    return size
+
+@st.cache_resource
+def get_figure_cache():
+    """Get the figure cache shared by every session of the process"""
+    return FigureCache()
+
+def project_chart(create_chart, records, *params):
+    """Create a chart of the current project's records, reusing it while the project is unchanged
+
+    Records with unsaved changes are always drawn afresh, as the project
+    version does not describe them yet.
+    """
+    project = st.session_state.current_project
+    if project is None or (hasattr(records, 'has_changes') and records.has_changes()):
+        return create_chart(records, *params)
+
+    version = get_user_store().version(project['username'], project['project_id'])
+    key = (project['username'], project['project_id'], version, create_chart.__name__, params)
+    return get_figure_cache().get_or_build(key, lambda: create_chart(records, *params))
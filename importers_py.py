@@ -0,0 +1,210 @@
+import datetime
+import io
+import os
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+from config_py import IMPORT_BATCH_ROWS
+from dates_py import format_date
+from schema_py import TASK_SCHEMA
+from utils_py import (
+    EXCEL_PARSER_VERSION, clean_task_frame, error_warnings,
+    parse_excel_plan, process_uploaded_plan
+)
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+# Importers for uploaded project plans, by file extension
+IMPORTERS = {}
+
+def register_importer(*extensions, version=1):
+    """Register a function parsing the bytes of a plan into tasks, milestones and warnings
+
+    The importer is called as parse(data, progress) and must return records
+    with the same keys as the Excel importer. Bump version whenever its
+    output changes, so cached results of the old version are not reused.
+    """
+    def register(parse):
+        for extension in extensions:
+            IMPORTERS[extension.lower()] = (parse, f"{parse.__name__}-{version}")
+        return parse
+    return register
+
+def get_importer(filename):
+    """Get the parse function and parser version for a file name, or None"""
+    return IMPORTERS.get(os.path.splitext(filename)[1].lower())
+
+def supported_extensions():
+    """Get the file extensions that can be imported, without the leading dot"""
+    return sorted(extension.lstrip('.') for extension in IMPORTERS)
+
+def process_uploaded_file(upload_file, progress=None):
+    """Process an uploaded plan with the importer matching its file name"""
+    importer = get_importer(upload_file.name)
+    if importer is None:
+        return False, f"Unsupported file type: {upload_file.name}"
+
+    parse, parser_version = importer
+    return process_uploaded_plan(upload_file, parse, parser_version, progress)
+
+register_importer('.xlsx', '.xls', version=EXCEL_PARSER_VERSION)(parse_excel_plan)
+
+# Functions for tabular formats
+def _report_rows(progress, rows_read, rows_total=None):
+    if progress:
+        fraction = min(rows_read / rows_total, 1.0) if rows_total else 0.0
+        progress(fraction, f"Reading tasks: {rows_read:,} rows")
+
+@register_importer('.csv', version=2)
+def parse_csv_plan(data, progress=None):
+    """Parse a CSV plan with the task sheet's columns, reading it in batches"""
+    header = TASK_SCHEMA.resolve(pd.read_csv(io.BytesIO(data), nrows=0).columns)
+    header.check()
+
+    tasks = []
+    errors = []
+    schema = None
+    rows_read = 0
+    chunks = pd.read_csv(io.BytesIO(data), usecols=header.found_headers(), dtype=str, chunksize=IMPORT_BATCH_ROWS)
+    for chunk in chunks:
+        # Every chunk has the same columns, so they are resolved once; row 1 is the header
+        schema = schema or TASK_SCHEMA.resolve(chunk.columns)
+        chunk_tasks, chunk_errors = clean_task_frame(chunk, len(tasks) + 1, rows_read + 2, schema)
+        tasks.extend(chunk_tasks)
+        errors.extend(chunk_errors)
+        rows_read += len(chunk)
+        _report_rows(progress, rows_read)
+
+    return tasks, [], error_warnings(errors)
+
+if pq is not None:
+    @register_importer('.parquet', version=2)
+    def parse_parquet_plan(data, progress=None):
+        """Parse a Parquet plan, reading only the task columns, one batch of rows at a time"""
+        parquet_file = pq.ParquetFile(io.BytesIO(data))
+        header = TASK_SCHEMA.resolve(parquet_file.schema_arrow.names)
+        header.check()
+
+        tasks = []
+        errors = []
+        schema = None
+        rows_read = 0
+        rows_total = parquet_file.metadata.num_rows
+        for batch in parquet_file.iter_batches(batch_size=IMPORT_BATCH_ROWS, columns=header.found_headers()):
+            chunk = batch.to_pandas(integer_object_nulls=True, date_as_object=True)
+            schema = schema or TASK_SCHEMA.resolve(chunk.columns)
+            chunk_tasks, chunk_errors = clean_task_frame(chunk, len(tasks) + 1, rows_read + 1, schema)
+            tasks.extend(chunk_tasks)
+            errors.extend(chunk_errors)
+            rows_read += batch.num_rows
+            _report_rows(progress, rows_read, rows_total)
+
+        return tasks, [], error_warnings(errors)
+
+# Functions for MS Project XML
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def _project_date(text):
+    """Convert an MS Project date-time to the plan date format"""
+    if not text:
+        return ''
+    try:
+        return format_date(datetime.datetime.fromisoformat(text).date())
+    except ValueError:
+        return ''
+
+def _project_days(text):
+    """Convert an MS Project duration such as PT16H0M0S to whole working days"""
+    if not text or not text.startswith('PT'):
+        return ''
+    hours = 0.0
+    number = ''
+    for char in text[2:]:
+        if char.isdigit() or char == '.':
+            number += char
+            continue
+        if number:
+            hours += float(number) * {'H': 1, 'M': 1 / 60, 'S': 1 / 3600}.get(char, 0)
+        number = ''
+    return str(int(round(hours / 8)))
+
+@register_importer('.xml')
+def parse_project_xml(data, progress=None):
+    """Parse an MS Project XML file, handling each task as soon as it has been read
+
+    Milestone tasks are also listed as milestones. Owners and dependencies
+    refer to resources and tasks by UID, so they are filled in at the end.
+    """
+    tasks = []
+    milestones = []
+    task_rows = {}
+    wbs_by_uid = {}
+    predecessors = {}
+    resources = {}
+    owners = {}
+
+    for event, element in ET.iterparse(io.BytesIO(data), events=('end',)):
+        name = _local_name(element.tag)
+        if name not in ('Task', 'Resource', 'Assignment'):
+            continue
+
+        fields = {}
+        links = []
+        for child in element:
+            child_name = _local_name(child.tag)
+            if child_name == 'PredecessorLink':
+                links.extend(link.text for link in child if _local_name(link.tag) == 'PredecessorUID')
+            else:
+                fields[child_name] = (child.text or '').strip()
+        element.clear()
+
+        if name == 'Resource':
+            resources[fields.get('UID')] = fields.get('Name', '')
+        elif name == 'Assignment':
+            owners.setdefault(fields.get('TaskUID'), []).append(fields.get('ResourceUID'))
+        elif fields.get('OutlineLevel', '1') != '0' and fields.get('Name'):
+            # Level 0 is the project summary task
+            uid = fields.get('UID')
+            wbs = fields.get('WBS') or fields.get('OutlineNumber') or fields.get('ID', '')
+            task_rows[uid] = len(tasks)
+            wbs_by_uid[uid] = wbs
+            predecessors[uid] = links
+            tasks.append({
+                'id': str(len(tasks) + 1),
+                'wbs': wbs,
+                'title': fields['Name'],
+                'description': fields.get('Notes', ''),
+                'dependencies': '',
+                'owner': '',
+                'completion': f"{fields.get('PercentComplete') or 0}%",
+                'scheduled_start': _project_date(fields.get('Start')),
+                'scheduled_finish': _project_date(fields.get('Finish')),
+                'actual_start': _project_date(fields.get('ActualStart')),
+                'actual_finish': _project_date(fields.get('ActualFinish')),
+                'finish_variance': '',
+                'duration': _project_days(fields.get('Duration'))
+            })
+            if fields.get('Milestone') == '1':
+                milestones.append({
+                    'id': str(len(milestones) + 1),
+                    'name': fields['Name'],
+                    'start_date': tasks[-1]['scheduled_start'],
+                    'end_date': tasks[-1]['scheduled_finish'],
+                    'key_milestone': ''
+                })
+            if len(tasks) % IMPORT_BATCH_ROWS == 0:
+                _report_rows(progress, len(tasks))
+
+    # Resolve task and resource UIDs now that the whole file has been read
+    for uid, row in task_rows.items():
+        tasks[row]['dependencies'] = ', '.join(wbs_by_uid[link] for link in predecessors[uid] if link in wbs_by_uid)
+        tasks[row]['owner'] = ', '.join(
+            resources[resource] for resource in owners.get(uid, []) if resources.get(resource)
+        )
+    _report_rows(progress, len(tasks), len(tasks))
+
+    return tasks, milestones, []
@@ -1,6 +1,5 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import datetime
 import base64
 import json
@@ -11,11 +10,22 @@ import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import custom modules
-from auth_py import init_users, login_user, register_user, user_exists, authenticate_project, create_project, get_user_projects
-from project_py import init_project_data, load_project_data, save_project_data
-from utils_py import process_uploaded_excel, export_to_excel, parse_date
-from visualization_py import create_gantt_chart, create_resource_utilization_chart, create_task_completion_chart, create_milestone_timeline
+from auth_py import init_users, login_user, register_user, user_exists, authenticate_project, create_project, create_projects, get_project_catalog, get_user_store, list_user_projects
+from project_py import init_project_data, load_project_data, save_project_data, get_persistence_stats
+from utils_py import export_to_excel, parse_date
+from importers_py import process_uploaded_file, supported_extensions
+from parquet_export_py import export_projects_archive
+from batch_import_py import collect_plan_files, parse_plan_files, project_name_for
+from visualization_py import create_gantt_chart, create_large_gantt_chart, get_gantt_rows, create_resource_utilization_chart, create_task_completion_chart, create_milestone_timeline
+from task_store_py import get_task_store
+from utilization_py import get_utilization, GRANULARITIES
+from metrics_py import get_project_metrics, get_task_metrics
+from figure_cache_py import project_chart, get_figure_cache
 from styles_py import load_css
+from snapshot_py import encode_snapshot, decode_snapshot, is_snapshot
+from session_py import init_session
+from upload_cache_py import get_upload_cache
+from config_py import GANTT_DETAIL_ROWS, UTILIZATION_MAX_COLUMNS
 
 # Set page config
 st.set_page_config(
@@ -39,10 +49,13 @@ def main():
     # Check if user is logged in
     if 'logged_in' not in st.session_state:
         st.session_state.logged_in = False
-        
+    
     if 'username' not in st.session_state:
         st.session_state.username = None
     
+    # Restore the session from its signed token after a reload
+    init_session()
+    
     # Authentication section
     if not st.session_state.logged_in:
         # Show login/register form
@@ -124,7 +137,7 @@ def main():
         Please save these passwords, as they cannot be recovered if lost.
         </div>
         """, unsafe_allow_html=True)
-            
+    
     else:
         # User is logged in
         st.sidebar.success(f"Logged in as: {st.session_state.username}")
@@ -164,9 +177,14 @@ def main():
                 
                 with col3:
                     if st.session_state.edit_mode:
-                        upload_file = st.file_uploader("Upload Excel", type=["xlsx", "xls"], key="project_plan_upload")
+                        upload_file = st.file_uploader("Upload Plan", type=supported_extensions(), key="project_plan_upload")
                         if upload_file:
-                            success, message = process_uploaded_excel(upload_file)
+                            progress_placeholder = st.empty()
+                            success, message = process_uploaded_file(
+                                upload_file,
+                                progress=lambda fraction, text: progress_placeholder.progress(fraction, text=text)
+                            )
+                            progress_placeholder.empty()
                             if success:
                                 st.success(message)
                             else:
@@ -177,11 +195,10 @@ def main():
                     st.subheader("Add New Task")
                     
                     # Create WBS options
+                    task_store = get_task_store(st.session_state.tasks)
                     wbs_options = ["1"]
-                    for task in st.session_state.tasks:
-                        wbs_parts = task['wbs'].split('.')
-                        if len(wbs_parts) == 1:
-                            wbs_options.append(f"{task['wbs']}.1")
+                    for position in task_store.wbs_index.level(1):
+                        wbs_options.append(f"{task_store.wbs[position]}.1")
                     
                     task_wbs = st.selectbox("WBS", wbs_options)
                     task_title = st.text_input("Task Title")
@@ -252,7 +269,8 @@ def main():
                 st.subheader("Tasks")
                 if st.session_state.tasks:
                     # Create expandable sections for top-level tasks
-                    top_level_tasks = [task for task in st.session_state.tasks if len(task['wbs'].split('.')) == 1]
+                    task_store = get_task_store(st.session_state.tasks)
+                    top_level_tasks = [task_store[position] for position in task_store.wbs_index.level(1)]
                     
                     for top_task in top_level_tasks:
                         with st.expander(f"{top_task['wbs']}. {top_task['title']}"):
@@ -268,7 +286,7 @@ def main():
                             st.markdown(f"**Description:** {top_task['description']}")
                             
                             # Get subtasks
-                            subtasks = [task for task in st.session_state.tasks if task['wbs'].startswith(f"{top_task['wbs']}.")]
+                            subtasks = [task_store[position] for position in task_store.wbs_index.descendants(top_task['wbs'])]
                             
                             if subtasks:
                                 # Display subtasks in a table
@@ -310,16 +328,30 @@ def main():
                 if st.button("Export to Excel"):
                     excel_data = export_to_excel()
                     if excel_data:
-                        # Create download link
-                        b64 = base64.b64encode(excel_data).decode()
-                        href = f'<a href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64}" download="project_plan.xlsx">Download Excel file</a>'
-                        st.markdown(href, unsafe_allow_html=True)
+                        st.download_button(
+                            "Download Excel file",
+                            excel_data,
+                            file_name="project_plan.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        )
             
             with project_tabs[1]:  # Resource Utilization tab
                 st.subheader("Resource Utilization")
                 
+                # Choose the time buckets, offering only those that keep the chart small enough
+                utilization = get_utilization(st.session_state.tasks) if st.session_state.tasks else None
+                granularity = None
+                if utilization is not None:
+                    granularities = [option for option in GRANULARITIES if utilization.bucket_count(option) <= UTILIZATION_MAX_COLUMNS] or [GRANULARITIES[-1]]
+                    selected_granularity = st.selectbox(
+                        "Group by",
+                        ["Auto"] + [option.capitalize() for option in granularities],
+                        key="utilization_granularity"
+                    )
+                    granularity = utilization.auto_granularity() if selected_granularity == "Auto" else selected_granularity.lower()
+                
                 # Generate resource utilization chart
-                resource_chart = create_resource_utilization_chart(st.session_state.tasks)
+                resource_chart = project_chart(create_resource_utilization_chart, st.session_state.tasks, granularity)
                 if resource_chart:
                     st.plotly_chart(resource_chart, use_container_width=True)
                 else:
@@ -327,6 +359,10 @@ def main():
                 
                 # Display resource allocation
                 if st.session_state.tasks:
+                    # Per-resource totals, from the scheduled dates
+                    owner_metrics = get_task_metrics(st.session_state.tasks)['owners']
+                    peak_tasks = utilization.peak() if utilization is not None else None
+                    
                     # Get unique resources
                     resources = {}
                     for task in st.session_state.tasks:
@@ -349,22 +385,12 @@ def main():
                             df = pd.DataFrame(tasks)
                             st.dataframe(df)
                             
-                            # Calculate resource workload
-                            total_days = 0
-                            for task in tasks:
-                                from utils import parse_date
-                                start_date = parse_date(task['Start'])
-                                finish_date = parse_date(task['Finish'])
-                                
-                                if start_date and finish_date:
-                                    # Exclude weekends
-                                    business_days = np.busday_count(
-                                        start_date.strftime('%Y-%m-%d'),
-                                        finish_date.strftime('%Y-%m-%d')
-                                    )
-                                    total_days += business_days
+                            # Resource workload, excluding weekends
+                            total_days = owner_metrics[resource]['working_days']
                             
                             st.metric("Total Working Days", total_days)
+                            if utilization is not None:
+                                st.metric("Peak Concurrent Tasks", int(peak_tasks[utilization.owners.index(resource)]))
             
             with project_tabs[2]:  # Analytics tab
                 st.subheader("Project Analytics")
@@ -372,33 +398,12 @@ def main():
                 # Create metrics
                 col1, col2, col3, col4 = st.columns(4)
                 
-                # Calculate metrics
-                total_tasks = len(st.session_state.tasks)
-                
-                completed_tasks = 0
-                for task in st.session_state.tasks:
-                    completion = 0
-                    if task['completion'] and task['completion'].strip():
-                        try:
-                            completion = float(task['completion'].replace('%', '')) / 100
-                        except:
-                            completion = 0
-                    
-                    if completion >= 1:
-                        completed_tasks += 1
-                
-                completion_percentage = 0
-                if total_tasks > 0:
-                    completion_percentage = int((completed_tasks / total_tasks) * 100)
-                
-                # Calculate total duration
-                total_duration = 0
-                for task in st.session_state.tasks:
-                    if task['duration'] and task['duration'].strip():
-                        try:
-                            total_duration += int(task['duration'])
-                        except:
-                            pass
+                # Read the project metrics, computed once per change to the tasks or milestones
+                metrics = get_project_metrics(st.session_state.tasks, st.session_state.milestones)
+                total_tasks = metrics['total_tasks']
+                completion_percentage = metrics['completion_percentage']
+                total_duration = metrics['total_duration']
+                milestone_count = metrics['milestones']
                 
                 with col1:
                     st.markdown('<div class="metric-card">', unsafe_allow_html=True)
@@ -420,7 +425,7 @@ def main():
                 
                 with col4:
                     st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                    st.markdown(f'<div class="metric-value">{len(st.session_state.milestones)}</div>', unsafe_allow_html=True)
+                    st.markdown(f'<div class="metric-value">{milestone_count}</div>', unsafe_allow_html=True)
                     st.markdown('<div class="metric-label">Milestones</div>', unsafe_allow_html=True)
                     st.markdown('</div>', unsafe_allow_html=True)
                 
@@ -429,7 +434,7 @@ def main():
                 
                 with col1:
                     # Task completion chart
-                    completion_chart = create_task_completion_chart(st.session_state.tasks)
+                    completion_chart = project_chart(create_task_completion_chart, st.session_state.tasks)
                     if completion_chart:
                         st.plotly_chart(completion_chart, use_container_width=True)
                     else:
@@ -437,7 +442,7 @@ def main():
                 
                 with col2:
                     # Milestone timeline
-                    milestone_chart = create_milestone_timeline(st.session_state.milestones)
+                    milestone_chart = project_chart(create_milestone_timeline, st.session_state.milestones)
                     if milestone_chart:
                         st.plotly_chart(milestone_chart, use_container_width=True)
                     else:
@@ -446,33 +451,56 @@ def main():
             with project_tabs[3]:  # Gantt Chart tab
                 st.subheader("Gantt Chart")
                 
-                # Display Gantt chart
-                gantt_chart = create_gantt_chart(st.session_state.tasks)
-                if gantt_chart:
-                    st.plotly_chart(gantt_chart, use_container_width=True)
+                if len(st.session_state.tasks) > GANTT_DETAIL_ROWS:
+                    # Large plans are drawn with summary bars, which can be drilled into level by level
+                    parent_wbs = None
+                    bars = get_gantt_rows(st.session_state.tasks, parent_wbs)
+                    while bars.summaries():
+                        selected_wbs = st.selectbox(
+                            "Drill down into",
+                            [None] + bars.summaries(),
+                            format_func=lambda wbs: "All Tasks" if wbs is None else wbs,
+                            key=f"gantt_drill_{parent_wbs}"
+                        )
+                        if selected_wbs is None:
+                            break
+                        parent_wbs = selected_wbs
+                        bars = get_gantt_rows(st.session_state.tasks, parent_wbs)
+                    
+                    page = 1
+                    if bars.page_count() > 1:
+                        page = st.number_input(f"Page (of {bars.page_count()})", min_value=1, max_value=bars.page_count(), key=f"gantt_page_{parent_wbs}")
+                    
+                    gantt_chart = project_chart(create_large_gantt_chart, st.session_state.tasks, parent_wbs, page)
+                    if gantt_chart:
+                        st.plotly_chart(gantt_chart, use_container_width=True)
+                    else:
+                        st.info("No task data available for Gantt chart")
                 else:
-                    st.info("No task data available for Gantt chart")
+                    # Display Gantt chart
+                    gantt_chart = project_chart(create_gantt_chart, st.session_state.tasks)
+                    if gantt_chart:
+                        st.plotly_chart(gantt_chart, use_container_width=True)
+                    else:
+                        st.info("No task data available for Gantt chart")
                 
                 # Task drill-down
-                if st.session_state.tasks:
+                if st.session_state.tasks and len(st.session_state.tasks) <= GANTT_DETAIL_ROWS:
                     st.subheader("Task Drill-Down")
                     
                     # Get top-level tasks
-                    top_level_tasks = [task for task in st.session_state.tasks if len(task['wbs'].split('.')) == 1]
-                    top_level_options = [f"{task['wbs']}. {task['title']}" for task in top_level_tasks]
+                    task_store = get_task_store(st.session_state.tasks)
+                    top_level_tasks = [task_store[position] for position in task_store.wbs_index.level(1)]
+                    top_level_options = {f"{task['wbs']}. {task['title']}": task['wbs'] for task in top_level_tasks}
                     
-                    selected_task = st.selectbox("Select Task", ["All Tasks"] + top_level_options)
+                    selected_task = st.selectbox("Select Task", ["All Tasks"] + list(top_level_options))
                     
                     if selected_task != "All Tasks":
                         # Get selected task WBS
-                        selected_wbs = selected_task.split('.')[0]
+                        selected_wbs = top_level_options[selected_task]
                         
                         # Create Gantt chart for selected task and its subtasks
-                        task_gantt = create_gantt_chart(
-                            st.session_state.tasks,
-                            level=2,
-                            parent_wbs=selected_wbs
-                        )
+                        task_gantt = project_chart(create_gantt_chart, st.session_state.tasks, 2, selected_wbs)
                         
                         if task_gantt:
                             st.plotly_chart(task_gantt, use_container_width=True)
@@ -491,6 +519,24 @@ def main():
                         st.session_state.current_project['name'] = project_name
                         save_project_data()
                         st.success("Project information updated successfully")
+                    
+                    stats = get_persistence_stats()
+                    st.caption(
+                        f"Last save wrote {stats['last_records_written']} records "
+                        f"({stats['records_written']} records in {stats['saves']} saves, {stats['skipped_saves']} unchanged saves skipped)"
+                    )
+                    
+                    upload_cache = get_upload_cache()
+                    st.caption(
+                        f"Upload cache: {upload_cache.stats['hits']} hits, {upload_cache.stats['misses']} misses, "
+                        f"{len(upload_cache)} files ({upload_cache.size / (1024 * 1024):.1f} MB)"
+                    )
+                    
+                    figure_cache = get_figure_cache()
+                    st.caption(
+                        f"Figure cache: {figure_cache.stats['hits']} hits, {figure_cache.stats['misses']} misses, "
+                        f"{len(figure_cache)} charts ({figure_cache.size / (1024 * 1024):.1f} MB)"
+                    )
                 
                 # Project access info
                 st.markdown("### Project Access Information")
@@ -525,10 +571,41 @@ def main():
                         href = f'<a href="data:application/json;base64,{b64}" download="project_data.json">Download Project Data</a>'
                         st.markdown(href, unsafe_allow_html=True)
                     
-                    upload_file = st.file_uploader("Import Project Data", type=["json"], key="import_project")
+                    if st.button("Export Project Snapshot"):
+                        # Compact binary snapshot of the same data
+                        snapshot = encode_snapshot({
+                            'project_name': st.session_state.current_project['name'],
+                            'tasks': st.session_state.tasks,
+                            'milestones': st.session_state.milestones
+                        })
+                        
+                        st.download_button(
+                            "Download Project Snapshot",
+                            data=snapshot,
+                            file_name="project_data.pmsnap",
+                            mime="application/octet-stream"
+                        )
+                    
+                    if st.button("Export to Parquet"):
+                        # Typed tables for analytics tools
+                        project = st.session_state.current_project
+                        # The archive's temporary file is deleted once the download has read it
+                        with export_projects_archive(get_user_store(), project['username'], [project['project_id']]) as archive:
+                            st.download_button(
+                                "Download Parquet Export",
+                                data=archive,
+                                file_name="project_parquet.zip",
+                                mime="application/zip"
+                            )
+                    
+                    upload_file = st.file_uploader("Import Project Data", type=["json", "pmsnap"], key="import_project")
                     if upload_file:
                         try:
-                            import_data = json.load(upload_file)
+                            upload_data = upload_file.getvalue()
+                            if is_snapshot(upload_data):
+                                import_data = decode_snapshot(upload_data)
+                            else:
+                                import_data = json.loads(upload_data)
                             
                             # Update project data
                             st.session_state.current_project['name'] = import_data['project_name']
@@ -545,13 +622,40 @@ def main():
             st.markdown('<div class="sub-header">Project Dashboard</div>', unsafe_allow_html=True)
             
             # Create tabs
-            dashboard_tabs = st.tabs(["My Projects", "Create New Project"])
+            dashboard_tabs = st.tabs(["My Projects", "Create New Project", "Batch Import"])
             
             with dashboard_tabs[0]:  # My Projects tab
                 st.subheader("My Projects")
                 
-                # Get user's projects
-                projects = get_user_projects(st.session_state.username)
+                # Project listing controls
+                col1, col2, col3 = st.columns([2, 1, 1])
+                with col1:
+                    search = st.text_input("Search projects by name", key="project_search")
+                with col2:
+                    sort_option = st.selectbox("Sort by", ["Name", "Newest first", "Oldest first"], key="project_sort")
+                with col3:
+                    page_size = st.selectbox("Per page", [10, 20, 50, 100], index=1, key="project_page_size")
+                
+                sort_key, descending = {
+                    "Name": ('name', False),
+                    "Newest first": ('created_at', True),
+                    "Oldest first": ('created_at', False)
+                }[sort_option]
+                
+                # Get one page of the user's projects
+                page = st.session_state.get('project_page', 1)
+                projects, total = list_user_projects(
+                    st.session_state.username, page=page, page_size=page_size,
+                    sort=sort_key, descending=descending, prefix=search
+                )
+                page_count = max(1, -(-total // page_size))
+                if page > page_count:
+                    # The search or page size changed under the current page
+                    page = st.session_state.project_page = page_count
+                    projects, total = list_user_projects(
+                        st.session_state.username, page=page, page_size=page_size,
+                        sort=sort_key, descending=descending, prefix=search
+                    )
                 
                 if projects:
                     # Display projects in a table
@@ -566,16 +670,28 @@ def main():
                     df = pd.DataFrame(project_data)
                     st.dataframe(df)
                     
-                    # Select project to load
-                    project_options = [project['name'] for project in projects]
-                    selected_project = st.selectbox("Select Project", project_options)
+                    if page_count > 1:
+                        st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, key="project_page")
+                    st.caption(f"{total} projects")
                     
-                    # Find selected project ID
-                    selected_id = None
-                    for project in projects:
-                        if project['name'] == selected_project:
-                            selected_id = project['id']
-                            break
+                    if st.button("Export All Projects to Parquet"):
+                        catalog = get_project_catalog(st.session_state.username)
+                        project_ids = [entry['id'] for entry in catalog.page(1, len(catalog))[0]]
+                        with export_projects_archive(get_user_store(), st.session_state.username, project_ids) as archive:
+                            st.download_button(
+                                "Download Parquet Export",
+                                data=archive,
+                                file_name="projects_parquet.zip",
+                                mime="application/zip"
+                            )
+                    
+                    # Select project to load
+                    catalog = get_project_catalog(st.session_state.username)
+                    selected_id = st.selectbox(
+                        "Select Project",
+                        [project['id'] for project in projects],
+                        format_func=lambda project_id: f"{catalog.get(project_id)['name']} ({project_id})"
+                    )
                     
                     # Ask for password
                     if selected_id:
@@ -599,6 +715,8 @@ def main():
                                     st.experimental_rerun()
                                 else:
                                     st.error(message)
+                elif search:
+                    st.info("No projects match your search")
                 else:
                     st.info("You don't have any projects yet")
                     st.markdown("Go to the 'Create New Project' tab to create your first project")
@@ -646,6 +764,78 @@ def main():
                             st.error(result)
                     else:
                         st.warning("Please enter a project name")
+            
+            with dashboard_tabs[2]:  # Batch Import tab
+                st.subheader("Batch Import")
+                st.markdown("Upload several project plans, or zip archives of plans, to create one project per plan.")
+                
+                batch_files = st.file_uploader(
+                    "Project Plans",
+                    type=supported_extensions() + ["zip"],
+                    accept_multiple_files=True,
+                    key="batch_import_upload"
+                )
+                
+                if batch_files and st.button("Import Plans"):
+                    files, skipped = collect_plan_files(batch_files)
+                    for name in skipped:
+                        st.warning(f"Skipped unsupported file: {name}")
+                    
+                    # Parse all plans in parallel, reporting each file as it finishes
+                    progress_bar = st.progress(0.0)
+                    results = parse_plan_files(
+                        files,
+                        progress=lambda done, total, name: progress_bar.progress(done / total, text=f"Parsed {name} ({done}/{total})")
+                    )
+                    
+                    # Create every parsed project in one batched write
+                    parsed = [index for index, (_, _, error) in enumerate(results) if error is None]
+                    plans = []
+                    for index in parsed:
+                        name, (tasks, milestones, _), _ = results[index]
+                        plans.append({
+                            'name': project_name_for(name),
+                            'tasks': [dict(task) for task in tasks],
+                            'milestones': [dict(milestone) for milestone in milestones]
+                        })
+                    success, credentials = create_projects(st.session_state.username, plans) if plans else (True, [])
+                    if not success:
+                        st.error(credentials)
+                        credentials = []
+                    
+                    # Report the outcome of each file
+                    created = dict(zip(parsed, credentials))
+                    report = []
+                    for index, (name, result, error) in enumerate(results):
+                        entry = created.get(index)
+                        if error:
+                            status = error
+                        elif entry is None:
+                            status = 'Not saved'
+                        else:
+                            status = '; '.join(result[2]) or 'Imported'
+                        
+                        report.append({
+                            'File': name,
+                            'Project Name': project_name_for(name),
+                            'Project ID': entry['project_id'] if entry else '',
+                            'Tasks': len(result[0]) if result else 0,
+                            'Milestones': len(result[1]) if result else 0,
+                            'Edit Password': entry['edit_password'] if entry else '',
+                            'View Password': entry['view_password'] if entry else '',
+                            'Status': status
+                        })
+                    
+                    report_df = pd.DataFrame(report)
+                    st.success(f"Imported {len(created)} of {len(results)} plans")
+                    st.markdown("**IMPORTANT:** Save these credentials. They cannot be recovered if lost.")
+                    st.dataframe(report_df)
+                    st.download_button(
+                        "Download Credentials",
+                        report_df.to_csv(index=False),
+                        file_name="project_credentials.csv",
+                        mime="text/csv"
+                    )
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,186 @@
+import os
+import shutil
+import tempfile
+import zipfile
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from task_store_py import TaskStore, NO_DATE, ordinals_to_dates
+from dates_py import parse_date_column
+
+# Schemas of the exported tables
+TASK_TABLE_SCHEMA = pa.schema([
+    ('project_id', pa.string()),
+    ('project_name', pa.string()),
+    ('task_id', pa.string()),
+    ('wbs', pa.string()),
+    ('title', pa.string()),
+    ('description', pa.string()),
+    ('dependencies', pa.string()),
+    ('owner', pa.string()),
+    ('completion', pa.float64()),
+    ('scheduled_start', pa.date32()),
+    ('scheduled_finish', pa.date32()),
+    ('actual_start', pa.date32()),
+    ('actual_finish', pa.date32()),
+    ('finish_variance', pa.string()),
+    ('duration', pa.int64())
+])
+
+MILESTONE_TABLE_SCHEMA = pa.schema([
+    ('project_id', pa.string()),
+    ('project_name', pa.string()),
+    ('milestone_id', pa.string()),
+    ('name', pa.string()),
+    ('start_date', pa.date32()),
+    ('end_date', pa.date32()),
+    ('key_milestone', pa.string())
+])
+
+ALLOCATION_TABLE_SCHEMA = pa.schema([
+    ('project_id', pa.string()),
+    ('project_name', pa.string()),
+    ('owner', pa.string()),
+    ('task_id', pa.string()),
+    ('wbs', pa.string()),
+    ('start_date', pa.date32()),
+    ('finish_date', pa.date32()),
+    ('working_days', pa.int64()),
+    ('completion', pa.float64())
+])
+
+# Functions for building one project's tables
+def _date_array(ordinals):
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    return pa.array(ordinals_to_dates(ordinals), type=pa.date32(), mask=ordinals == NO_DATE)
+
+def _repeat(value, count):
+    return pa.array([value] * count, type=pa.string())
+
+def task_table(project_id, project_name, store):
+    """Build the typed task table of one project from its task store"""
+    count = len(store)
+    blank_duration = np.array([not (task['duration'] and task['duration'].strip()) for task in store.records], dtype=bool)
+    return pa.Table.from_arrays([
+        _repeat(project_id, count),
+        _repeat(project_name, count),
+        pa.array([task['id'] for task in store.records], type=pa.string()),
+        pa.array(store.wbs, type=pa.string()),
+        pa.array(store.titles, type=pa.string()),
+        pa.array([task['description'] for task in store.records], type=pa.string()),
+        pa.array([task['dependencies'] for task in store.records], type=pa.string()),
+        pa.array([task['owner'] for task in store.records], type=pa.string()),
+        pa.array(store.completion, type=pa.float64()),
+        _date_array(store.scheduled_start),
+        _date_array(store.scheduled_finish),
+        _date_array(store.actual_start),
+        _date_array(store.actual_finish),
+        pa.array([task['finish_variance'] for task in store.records], type=pa.string()),
+        pa.array(store.duration, type=pa.int64(), mask=blank_duration)
+    ], schema=TASK_TABLE_SCHEMA)
+
+def milestone_table(project_id, project_name, milestones):
+    """Build the typed milestone table of one project"""
+    count = len(milestones)
+    dates = {
+        key: [NO_DATE if date is None else date.toordinal() for date in parse_date_column([milestone[key] for milestone in milestones])]
+        for key in ('start_date', 'end_date')
+    }
+    return pa.Table.from_arrays([
+        _repeat(project_id, count),
+        _repeat(project_name, count),
+        pa.array([milestone['id'] for milestone in milestones], type=pa.string()),
+        pa.array([milestone['name'] for milestone in milestones], type=pa.string()),
+        _date_array(dates['start_date']),
+        _date_array(dates['end_date']),
+        pa.array([milestone['key_milestone'] for milestone in milestones], type=pa.string())
+    ], schema=MILESTONE_TABLE_SCHEMA)
+
+def allocation_table(project_id, project_name, store):
+    """Build the resource allocation table of one project: one row per owned task with dates"""
+    rows = np.flatnonzero(store.has_owner() & store.has_dates())
+    count = len(rows)
+    return pa.Table.from_arrays([
+        _repeat(project_id, count),
+        _repeat(project_name, count),
+        pa.array([store.owners[code] for code in store.owner_codes[rows]], type=pa.string()),
+        pa.array([store.records[row]['id'] for row in rows], type=pa.string()),
+        pa.array([store.wbs[row] for row in rows], type=pa.string()),
+        _date_array(store.start[rows]),
+        _date_array(store.finish[rows]),
+        pa.array(np.busday_count(ordinals_to_dates(store.start[rows]), ordinals_to_dates(store.finish[rows])), type=pa.int64()),
+        pa.array(store.completion[rows], type=pa.float64())
+    ], schema=ALLOCATION_TABLE_SCHEMA)
+
+# Functions for exporting projects
+def _project_items(user_store, username, project_id):
+    """Get a project's tasks and milestones without keeping projects loaded on demand in memory"""
+    project = user_store.users[username]['projects'][project_id]
+    if 'tasks' in project and 'milestones' in project:
+        return project['tasks'], project['milestones']
+    
+    items = user_store.storage.load_project_items(username, project_id) or {}
+    return items.get('tasks', []), items.get('milestones', [])
+
+def export_projects_parquet(user_store, username, project_ids, directory):
+    """Write the tasks, milestones and allocations of projects as Parquet files in a directory
+
+    Each table gets its own file and each project its own row group, and
+    only one project is held in memory at a time. Returns the number of
+    rows written to each file.
+    """
+    paths = {
+        'tasks': os.path.join(directory, 'tasks.parquet'),
+        'milestones': os.path.join(directory, 'milestones.parquet'),
+        'allocations': os.path.join(directory, 'allocations.parquet')
+    }
+    counts = {name: 0 for name in paths}
+    writers = {
+        'tasks': pq.ParquetWriter(paths['tasks'], TASK_TABLE_SCHEMA),
+        'milestones': pq.ParquetWriter(paths['milestones'], MILESTONE_TABLE_SCHEMA),
+        'allocations': pq.ParquetWriter(paths['allocations'], ALLOCATION_TABLE_SCHEMA)
+    }
+    try:
+        for project_id in project_ids:
+            # Build the tables under the user lock so that concurrent edits are not half-exported
+            with user_store.lock(username):
+                project_name = user_store.users[username]['projects'][project_id]['name']
+                tasks, milestones = _project_items(user_store, username, project_id)
+                store = TaskStore(tasks)
+                tables = {
+                    'tasks': task_table(project_id, project_name, store),
+                    'milestones': milestone_table(project_id, project_name, milestones),
+                    'allocations': allocation_table(project_id, project_name, store)
+                }
+            for name, table in tables.items():
+                if table.num_rows:
+                    writers[name].write_table(table, row_group_size=table.num_rows)
+                    counts[name] += table.num_rows
+    finally:
+        for writer in writers.values():
+            writer.close()
+    
+    return counts
+
+def export_projects_archive(user_store, username, project_ids):
+    """Export projects as a zip archive of Parquet files written to a temporary file
+
+    Returns the archive as an open binary file positioned at its start,
+    so that it never has to be held in memory as bytes. The file is
+    deleted when closed.
+    """
+    archive_file = tempfile.TemporaryFile(prefix='pm-parquet-', suffix='.zip')
+    directory = tempfile.mkdtemp(prefix='pm-parquet-')
+    try:
+        export_projects_parquet(user_store, username, project_ids, directory)
+        with zipfile.ZipFile(archive_file, 'w', zipfile.ZIP_STORED) as archive:
+            for name in ('tasks.parquet', 'milestones.parquet', 'allocations.parquet'):
+                archive.write(os.path.join(directory, name), name)
+        archive_file.seek(0)
+        return archive_file
+    except Exception:
+        archive_file.close()
+        raise
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
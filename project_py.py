@@ -1,5 +1,6 @@
 import streamlit as st
-from auth_py import user_exists, save_users
+from auth_py import user_exists, save_project, get_user_store
+from tracking_py import track_records
 
 # Functions for project data management
 def init_project_data():
@@ -15,13 +16,32 @@ def init_project_data():
     
     if 'milestones' not in st.session_state:
         st.session_state.milestones = []
+    
+    if 'project_version' not in st.session_state:
+        st.session_state.project_version = 0
+    
+    refresh_project_data()
+
+def refresh_project_data():
+    """Reload the current project if another session saved it since it was loaded"""
+    if st.session_state.current_project is None:
+        return False
+    
+    username = st.session_state.current_project['username']
+    project_id = st.session_state.current_project['project_id']
+    
+    if get_user_store().version(username, project_id) == st.session_state.project_version:
+        return False
+    
+    return load_project_data(username, project_id)
 
 def load_project_data(username, project_id):
     """Load project data into session state"""
     if not user_exists(username) or project_id not in st.session_state.users[username]['projects']:
         return False
     
-    project_data = st.session_state.users[username]['projects'][project_id]
+    # Read the project's tasks and milestones only now that it is opened
+    project_data = get_user_store().ensure_project_loaded(username, project_id)
     
     # Set current project
     st.session_state.current_project = {
@@ -29,17 +49,21 @@ def load_project_data(username, project_id):
         'project_id': project_id,
         'name': project_data['name']
     }
+    st.session_state.project_version = get_user_store().version(username, project_id)
     
-    # Load tasks and milestones
-    if 'tasks' in project_data:
-        st.session_state.tasks = project_data['tasks']
-    else:
-        st.session_state.tasks = []
-    
-    if 'milestones' in project_data:
-        st.session_state.milestones = project_data['milestones']
-    else:
-        st.session_state.milestones = []
+    # Load tasks and milestones, tracking changes made to them
+    with get_user_store().lock(username):
+        if 'tasks' in project_data:
+            project_data['tasks'] = track_records(project_data['tasks'])
+            st.session_state.tasks = project_data['tasks']
+        else:
+            st.session_state.tasks = track_records([])
+        
+        if 'milestones' in project_data:
+            project_data['milestones'] = track_records(project_data['milestones'])
+            st.session_state.milestones = project_data['milestones']
+        else:
+            st.session_state.milestones = track_records([])
     
     return True
 
@@ -54,10 +78,44 @@ def save_project_data():
     if not user_exists(username) or project_id not in st.session_state.users[username]['projects']:
         return False
     
-    # Save tasks and milestones
-    st.session_state.users[username]['projects'][project_id]['tasks'] = st.session_state.tasks
-    st.session_state.users[username]['projects'][project_id]['milestones'] = st.session_state.milestones
+    store = get_user_store()
+    with store.lock(username):
+        project = st.session_state.users[username]['projects'][project_id]
+        
+        # Lists assigned wholesale (e.g. by an import) replace every stored record
+        tasks = track_records(st.session_state.tasks, len(project.get('tasks', [])))
+        milestones = track_records(st.session_state.milestones, len(project.get('milestones', [])))
+        name_changed = project['name'] != st.session_state.current_project['name']
+        
+        # Skip the save entirely when nothing changed
+        if not name_changed and not tasks.has_changes() and not milestones.has_changes():
+            store.record_skipped_save()
+            return True
+        
+        # Save tasks and milestones
+        if name_changed:
+            store.catalog(username).rename(project_id, st.session_state.current_project['name'])
+        project['name'] = st.session_state.current_project['name']
+        project['tasks'] = st.session_state.tasks = tasks
+        project['milestones'] = st.session_state.milestones = milestones
+        
+        changes = {
+            'meta': name_changed,
+            'tasks': tasks.changes(),
+            'milestones': milestones.changes()
+        }
+        version = save_project(username, project_id, changes)
+        
+        if version is None:
+            return False
+        
+        tasks.commit()
+        milestones.commit()
     
-    save_users()
+    st.session_state.project_version = version
     
-    return True
\ No newline at end of file
+    return True
+
+def get_persistence_stats():
+    """Get the counters of records written by project saves"""
+    return dict(get_user_store().stats)
@@ -0,0 +1,175 @@
+import pandas as pd
+from dates_py import parse_date_values
+
+# Ingestion schemas for the columns of uploaded plans
+class Column:
+    """One column of an ingestion schema
+
+    name is the canonical header and aliases are the other headers accepted
+    for it, in order of preference. parse, if given, converts a whole column
+    of cells at once and gives a missing value for every cell it rejects;
+    message says what a rejected cell should have held.
+    """
+
+    def __init__(self, name, aliases=(), required=False, parse=None, message='is not valid'):
+        self.name = name
+        self.aliases = tuple(aliases)
+        self.required = required
+        self.parse = parse
+        self.message = message
+
+
+class Schema:
+    """Columns expected in a sheet of an uploaded plan"""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.names = [column.name for column in self.columns]
+
+    def resolve(self, headers):
+        """Match the headers of a file to the schema's columns
+
+        Headers are matched by canonical name, then by alias, then by either
+        ignoring case and surrounding spaces. This is done once per file and
+        gives the position of each column among the headers.
+        """
+        exact = {}
+        folded = {}
+        for position, header in enumerate(headers):
+            if header is None:
+                continue
+            exact.setdefault(header, position)
+            folded.setdefault(_fold(header), position)
+
+        positions = {}
+        for column in self.columns:
+            candidates = (column.name,) + column.aliases
+            position = next((exact[name] for name in candidates if name in exact), None)
+            if position is None:
+                position = next((folded[_fold(name)] for name in candidates if _fold(name) in folded), None)
+            positions[column.name] = position
+
+        return CompiledSchema(self, positions, list(headers))
+
+    def parse(self, columns):
+        """Parse and check every column with a parser, a whole column at a time
+
+        columns maps column names to Series of cells indexed by row number.
+        Returns the parsed Series of those columns and the list of rejected
+        cells, ordered by row, as dictionaries with the row number, column
+        name, cell value and message. Missing and blank cells are not checked.
+        """
+        parsed = {}
+        errors = []
+        for column in self.columns:
+            if column.parse is None:
+                continue
+
+            values = columns[column.name]
+            parsed[column.name] = column.parse(values)
+            rejected = (present_cells(values) & parsed[column.name].isna()).astype(bool)
+            errors.extend(
+                {'row': int(row), 'column': column.name, 'value': value, 'message': column.message}
+                for row, value in values[rejected].items()
+            )
+
+        errors.sort(key=lambda error: error['row'])
+        return parsed, errors
+
+
+class CompiledSchema:
+    """A schema resolved against the headers of one file
+
+    Gives each schema column from the file's cells by position, so reading
+    rows needs no further header lookups. Columns the file does not have are
+    given as columns of missing cells.
+    """
+
+    def __init__(self, schema, positions, headers):
+        self.schema = schema
+        self.positions = positions
+        self.headers = headers
+        self.missing = [column.name for column in schema.columns if column.required and positions[column.name] is None]
+
+    def found(self, name):
+        """Whether the file has a column"""
+        return self.positions[name] is not None
+
+    def found_headers(self):
+        """Headers of the file used by the schema, in file order"""
+        return [self.headers[position] for position in sorted(set(self.positions.values()) - {None})]
+
+    def check(self):
+        """Raise a ValueError naming the required columns the file does not have"""
+        if self.missing:
+            raise ValueError(f"Missing required columns: {', '.join(self.missing)}")
+
+    def columns(self, cells, rows):
+        """Build a Series per schema column from lists of cells by header position, indexed by row number"""
+        return {
+            name: pd.Series(cells[position] if position is not None else None, index=rows, dtype=object)
+            for name, position in self.positions.items()
+        }
+
+    def frame_columns(self, df, first_row=1):
+        """Get each schema column of a DataFrame read with these headers
+
+        Cells are taken from df.values, so they are the values iterrows() would
+        give, and rows are numbered from first_row.
+        """
+        values = df.values
+        rows = pd.RangeIndex(first_row, first_row + len(df))
+        cells = {position: values[:, position] for position in set(self.positions.values()) - {None}}
+        return self.columns(cells, rows)
+
+
+def _fold(header):
+    return str(header).strip().casefold()
+
+def present_cells(values):
+    """Mask of the cells that are neither missing nor blank text"""
+    blank = values.map(lambda value: isinstance(value, str) and not value.strip()).astype(bool)
+    return values.notna() & ~blank
+
+# Column parsers
+def parse_numbers(values):
+    """Parse a column of numbers, which may be written as percentages such as 50%"""
+    text = values.map(lambda value: value.replace('%', '').strip() if isinstance(value, str) else value)
+    return pd.to_numeric(text, errors='coerce')
+
+def parse_whole_numbers(values):
+    """Parse a column of whole numbers, rejecting fractions"""
+    numbers = parse_numbers(values)
+    return numbers.where(numbers == numbers.round())
+
+# Columns read from the sheets of an uploaded plan, with the other headers accepted for them
+TASK_SCHEMA = Schema([
+    Column('WBS', ['ID'], required=True),
+    Column('TASK TITLE', required=True),
+    Column('TASK DESCRIPTION', ['Description']),
+    Column('DEPENDENCIES', ['Predecessors']),
+    Column('TASK OWNER', ['Owner', 'Resource']),
+    Column('PCT OF TASK COMPLETE', ['% Complete', 'Complete'], parse=parse_numbers, message='is not a percentage'),
+    Column('SCHEDULED START', ['Start Date', 'Start'], parse=parse_date_values, message='is not a date'),
+    Column('SCHEDULED FINISH', ['Finish Date', 'Finish'], parse=parse_date_values, message='is not a date'),
+    Column('ACTUAL START', parse=parse_date_values, message='is not a date'),
+    Column('ACTUAL FINISH', parse=parse_date_values, message='is not a date'),
+    Column('FINISH VARIANCE'),
+    Column('DURATION', parse=parse_whole_numbers, message='is not a whole number of days')
+])
+MILESTONE_SCHEMA = Schema([
+    Column('Milestones', ['Milestone'], required=True),
+    Column('Start Date', parse=parse_date_values, message='is not a date'),
+    Column('End Date', parse=parse_date_values, message='is not a date'),
+    Column('Key Milestones', ['Key Milestone'])
+])
+TASK_COLUMNS = TASK_SCHEMA.names
+MILESTONE_COLUMNS = MILESTONE_SCHEMA.names
+
+# Error reports
+def format_errors(errors, limit=20):
+    """Describe rejected cells as lines of text, at most limit of them"""
+    lines = [f"Row {error['row']}, {error['column']}: '{error['value']}' {error['message']}" for error in errors[:limit]]
+    if len(errors) > limit:
+        lines.append(f"... and {len(errors) - limit} more")
+    return lines
@@ -0,0 +1,120 @@
+import streamlit as st
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from config_py import SESSION_SECRET, SESSION_SECRET_FILE, SESSION_TTL_SECONDS
+from auth_py import user_exists
+from project_py import load_project_data
+
+# Name of the query parameter holding the session token
+TOKEN_PARAM = 'session'
+
+# Signed session tokens
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+@st.cache_resource
+def get_session_secret():
+    """Get the key used to sign session tokens"""
+    if SESSION_SECRET:
+        return SESSION_SECRET.encode('utf-8')
+
+    if os.path.exists(SESSION_SECRET_FILE):
+        with open(SESSION_SECRET_FILE, 'rb') as f:
+            return f.read()
+
+    secret = secrets.token_bytes(32)
+    try:
+        fd = os.open(SESSION_SECRET_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Another process created the secret first
+        with open(SESSION_SECRET_FILE, 'rb') as f:
+            return f.read()
+    with os.fdopen(fd, 'wb') as f:
+        f.write(secret)
+    return secret
+
+def issue_token(claims, secret, ttl=SESSION_TTL_SECONDS):
+    """Create an expiring, HMAC-signed token carrying the given claims"""
+    payload = dict(claims, exp=int(time.time()) + ttl)
+    body = _b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+    signature = hmac.new(secret, body.encode('ascii'), hashlib.sha256).digest()
+    return f"{body}.{_b64encode(signature)}"
+
+def verify_token(token, secret):
+    """Return the claims of a valid, unexpired token, or None"""
+    try:
+        body, signature = token.split('.')
+        expected = hmac.new(secret, body.encode('ascii'), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            return None
+        claims = json.loads(_b64decode(body))
+    except (ValueError, UnicodeError):
+        return None
+
+    if not isinstance(claims, dict) or claims.get('exp', 0) < time.time():
+        return None
+    return claims
+
+# Session restoration
+def _session_claims():
+    """Describe the authentication state of the current session"""
+    project = st.session_state.current_project
+    return {
+        'username': st.session_state.username,
+        'logged_in': st.session_state.logged_in,
+        'project_id': project['project_id'] if project is not None else None,
+        'edit_mode': st.session_state.edit_mode if project is not None else False
+    }
+
+def restore_session():
+    """Restore login and project state from the session token in the query string"""
+    token = st.query_params.get(TOKEN_PARAM)
+    if not token:
+        return False
+
+    claims = verify_token(token, get_session_secret())
+    if claims is None or not claims.get('username') or not user_exists(claims['username']):
+        return False
+
+    st.session_state.username = claims['username']
+    st.session_state.logged_in = bool(claims.get('logged_in'))
+
+    if claims.get('project_id') and load_project_data(claims['username'], claims['project_id']):
+        st.session_state.edit_mode = bool(claims.get('edit_mode'))
+
+    return True
+
+def sync_session_token():
+    """Issue a new session token when the authentication state changed, or drop it after logout"""
+    claims = _session_claims()
+    issued = st.session_state.session_claims
+
+    if not claims['username']:
+        if TOKEN_PARAM in st.query_params:
+            del st.query_params[TOKEN_PARAM]
+        st.session_state.session_claims = None
+        return
+
+    # Refresh tokens that have used up half of their lifetime
+    if issued is not None and issued['claims'] == claims and issued['exp'] - time.time() > SESSION_TTL_SECONDS / 2:
+        return
+
+    st.query_params[TOKEN_PARAM] = issue_token(claims, get_session_secret())
+    st.session_state.session_claims = {'claims': claims, 'exp': time.time() + SESSION_TTL_SECONDS}
+
+def init_session():
+    """Restore a session from its token on a fresh page load and keep the token current"""
+    if 'session_claims' not in st.session_state:
+        # First run of this browser session, e.g. after a reload
+        st.session_state.session_claims = None
+        restore_session()
+
+    sync_session_token()
@@ -0,0 +1,385 @@
+import datetime
+import json
+import struct
+import sys
+from array import array
+from itertools import repeat
+from operator import methodcaller
+
+# Compact binary snapshot format for project data
+#
+# A snapshot starts with the magic bytes and a schema version, followed by a
+# table of interned strings, a JSON block with the scalar fields of the
+# document (e.g. the project name) and one columnar block per list of records
+# (tasks, milestones). Every column is stored with a type suited to its field:
+# dates as day ordinals, percentages as floats, durations as integers and
+# owners as indexes into the string table. Other text columns are stored as
+# one UTF-8 blob of NUL-separated values, or as length-prefixed values when a
+# value contains NUL. Values that do not round-trip exactly through the typed
+# column are kept verbatim in a per-column fallback list, so decoding always
+# reproduces the original records. Columns are converted with map() and
+# str.split rather than per-row Python loops, so snapshots decode faster
+# than the equivalent JSON.
+
+SNAPSHOT_MAGIC = b'PMSN'
+SNAPSHOT_VERSION = 2
+
+# Column types
+COL_STRING = 1
+COL_INTERNED = 2
+COL_DATE = 3
+COL_PERCENT = 4
+COL_INT = 5
+COL_JSON = 6
+COL_TEXT = 7
+
+# Column type used for known record fields; anything else is stored as COL_STRING
+FIELD_TYPES = {
+    'owner': COL_INTERNED,
+    'scheduled_start': COL_DATE,
+    'scheduled_finish': COL_DATE,
+    'actual_start': COL_DATE,
+    'actual_finish': COL_DATE,
+    'start_date': COL_DATE,
+    'end_date': COL_DATE,
+    'completion': COL_PERCENT,
+    'duration': COL_INT
+}
+
+DATE_FORMAT = '%d/%m/%Y'
+
+# Sentinels inside typed columns
+DATE_EMPTY = 0
+DATE_FALLBACK = -1
+INT_EMPTY = -2 ** 31
+INT_FALLBACK = -2 ** 31 + 1
+INTERNED_FALLBACK = 2 ** 32 - 1
+INTERNED_MISSING = 2 ** 32 - 2
+STRING_FALLBACK = 2 ** 32 - 1
+
+_FLAG_PRESENCE = 1
+_MISSING = object()
+_FALLBACK = object()
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot cannot be decoded"""
+
+
+def is_snapshot(data):
+    """Check whether bytes look like a binary snapshot"""
+    return data[:len(SNAPSHOT_MAGIC)] == SNAPSHOT_MAGIC
+
+# Encoding
+def encode_snapshot(document):
+    """Encode a dictionary of scalar fields and record lists into a binary snapshot"""
+    strings = _StringTable()
+    meta = {}
+    collections = []
+    for key, value in document.items():
+        if isinstance(value, list) and all(map(isinstance, value, repeat(dict))):
+            collections.append((key, _encode_collection(value, strings)))
+        else:
+            meta[key] = value
+
+    out = bytearray(SNAPSHOT_MAGIC)
+    out += struct.pack('<H', SNAPSHOT_VERSION)
+
+    out += struct.pack('<I', len(strings.values))
+    for value in strings.values:
+        _write_bytes(out, value.encode('utf-8'))
+
+    _write_bytes(out, json.dumps(meta).encode('utf-8'))
+
+    out += struct.pack('<H', len(collections))
+    for name, block in collections:
+        _write_bytes(out, name.encode('utf-8'))
+        out += block
+
+    return bytes(out)
+
+def _encode_collection(records, strings):
+    # Fields in order of first appearance, taken from the distinct key layouts of the records
+    layouts = list(dict.fromkeys(map(tuple, records)))
+    fields = list(dict.fromkeys(key for layout in layouts for key in layout))
+
+    if len(layouts) == 1:
+        # Every record has the same keys in the same order, so the columns are a transpose of the values
+        columns = list(zip(*map(dict.values, records)))
+    else:
+        columns = [list(map(methodcaller('get', field, _MISSING), records)) for field in fields]
+
+    out = bytearray(struct.pack('<IH', len(records), len(fields)))
+    for field, values in zip(fields, columns):
+        _write_bytes(out, field.encode('utf-8'))
+        _write_bytes(out, _encode_column(field, values, strings))
+    return bytes(out)
+
+def _encode_column(field, values, strings):
+    col_type = FIELD_TYPES.get(field, COL_STRING)
+    all_strings = set(map(type, values)) <= {str}
+    if not all_strings:
+        # Columns made up mostly of non-string values are stored as JSON
+        non_strings = sum(1 for value in values if value is not _MISSING and not isinstance(value, str))
+        if non_strings * 2 > len(values):
+            col_type = COL_JSON
+    elif col_type == COL_STRING and values:
+        # Text columns are joined into one blob unless a value contains the separator
+        text = '\0'.join(values)
+        if text.count('\0') == len(values) - 1:
+            col_type = COL_TEXT
+
+    presence = None
+    if not all_strings and any(value is _MISSING for value in values):
+        presence = bytes(0 if value is _MISSING else 1 for value in values)
+
+    fallback = []
+    out = bytearray(struct.pack('<BB', col_type, _FLAG_PRESENCE if presence is not None else 0))
+    if presence is not None:
+        out += presence
+
+    if col_type == COL_DATE:
+        out += _encode_typed('i', values, _date_code, DATE_EMPTY, DATE_FALLBACK, fallback)
+    elif col_type == COL_PERCENT:
+        out += _encode_typed('f', values, _percent_code, 0.0, float('nan'), fallback)
+    elif col_type == COL_INT:
+        out += _encode_typed('i', values, _int_code, INT_EMPTY, INT_FALLBACK, fallback)
+    elif col_type == COL_INTERNED:
+        out += _encode_typed('I', values, strings.intern, INTERNED_MISSING, INTERNED_FALLBACK, fallback)
+    elif col_type == COL_TEXT:
+        _write_bytes(out, text.encode('utf-8'))
+    elif col_type == COL_STRING:
+        lengths = array('I')
+        encoded = []
+        for row, value in enumerate(values):
+            if isinstance(value, str):
+                data = value.encode('utf-8')
+                lengths.append(len(data))
+                encoded.append(data)
+            else:
+                lengths.append(STRING_FALLBACK)
+                if value is not _MISSING:
+                    fallback.append((row, value))
+        out += _array_bytes(lengths)
+        out += b''.join(encoded)
+    else:
+        for value in values:
+            _write_bytes(out, json.dumps(None if value is _MISSING else value).encode('utf-8'))
+
+    out += struct.pack('<I', len(fallback))
+    for row, value in fallback:
+        out += struct.pack('<I', row)
+        _write_bytes(out, json.dumps(value).encode('utf-8'))
+
+    return bytes(out)
+
+def _encode_typed(typecode, values, convert, missing_code, fallback_code, fallback):
+    """Convert string values to typed codes, converting each distinct value once"""
+    if set(map(type, values)) <= {str}:
+        # Distinct values in order of first appearance, so that interned strings are numbered deterministically
+        codes = {value: convert(value) for value in dict.fromkeys(values)}
+        if _FALLBACK not in codes.values():
+            return _array_bytes(array(typecode, map(codes.__getitem__, values)))
+
+    column = array(typecode)
+    codes = {}
+    for row, value in enumerate(values):
+        if isinstance(value, str):
+            code = codes.get(value)
+            if code is None:
+                code = convert(value)
+                codes[value] = code
+            if code is not _FALLBACK:
+                column.append(code)
+                continue
+        elif value is _MISSING:
+            column.append(missing_code)
+            continue
+        column.append(fallback_code)
+        fallback.append((row, value))
+    return _array_bytes(column)
+
+def _date_code(value):
+    if value == '':
+        return DATE_EMPTY
+    try:
+        parsed = datetime.datetime.strptime(value, DATE_FORMAT).date()
+    except ValueError:
+        return _FALLBACK
+    return parsed.toordinal() if parsed.strftime(DATE_FORMAT) == value else _FALLBACK
+
+def _percent_code(value):
+    if not value.endswith('%'):
+        return _FALLBACK
+    try:
+        number = struct.unpack('<f', struct.pack('<f', float(value[:-1])))[0]
+    except (ValueError, OverflowError):
+        return _FALLBACK
+    return number if _format_percent(number) == value else _FALLBACK
+
+def _int_code(value):
+    if value == '':
+        return INT_EMPTY
+    try:
+        number = int(value)
+    except ValueError:
+        return _FALLBACK
+    return number if str(number) == value and INT_FALLBACK < number < 2 ** 31 else _FALLBACK
+
+def _format_percent(number):
+    return f"{number:g}%"
+
+# Decoding
+def decode_snapshot(data):
+    """Decode a binary snapshot back into the dictionary it was created from"""
+    if not is_snapshot(data):
+        raise SnapshotError("Not a project snapshot")
+
+    reader = _Reader(data, len(SNAPSHOT_MAGIC))
+    version = reader.unpack('<H')
+    if version > SNAPSHOT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot version: {version}")
+
+    strings = [reader.read_bytes().decode('utf-8') for _ in range(reader.unpack('<I'))]
+    document = json.loads(reader.read_bytes().decode('utf-8'))
+
+    for _ in range(reader.unpack('<H')):
+        name = reader.read_bytes().decode('utf-8')
+        document[name] = _decode_collection(reader, strings)
+
+    return document
+
+def _decode_collection(reader, strings):
+    count, field_count = reader.unpack('<IH')
+    fields = []
+    columns = []
+    sparse = False
+    for _ in range(field_count):
+        fields.append(reader.read_bytes().decode('utf-8'))
+        values, has_presence = _decode_column(reader.read_bytes(), count, strings)
+        columns.append(values)
+        sparse = sparse or has_presence
+
+    if not sparse and columns:
+        return list(map(dict, map(zip, repeat(fields), zip(*columns))))
+
+    records = [{} for _ in range(count)]
+    for field, values in zip(fields, columns):
+        for record, value in zip(records, values):
+            if value is not _MISSING:
+                record[field] = value
+    return records
+
+def _decode_column(block, count, strings):
+    reader = _Reader(block)
+    col_type, flags = reader.unpack('<BB')
+    presence = reader.read(count) if flags & _FLAG_PRESENCE else None
+
+    if col_type == COL_DATE:
+        values = _decode_typed(reader.read_array('i', count), _date_text, DATE_FALLBACK)
+    elif col_type == COL_PERCENT:
+        # Percentages are memoized by their bit pattern, as -0.0 equals 0.0 but is written '-0%'
+        values = _decode_typed(reader.read_array('I', count), _percent_text, None)
+    elif col_type == COL_INT:
+        values = _decode_typed(reader.read_array('i', count), _int_text, INT_FALLBACK)
+    elif col_type == COL_INTERNED:
+        # Missing and fallback rows have codes outside the string table and are filled in below
+        values = _decode_typed(reader.read_array('I', count), lambda index: strings[index] if index < len(strings) else None, None)
+    elif col_type == COL_STRING:
+        values = _decode_strings(reader, count)
+    elif col_type == COL_TEXT:
+        values = reader.read_bytes().decode('utf-8').split('\0')
+    elif col_type == COL_JSON:
+        values = [json.loads(reader.read_bytes().decode('utf-8')) for _ in range(count)]
+    else:
+        raise SnapshotError(f"Unknown column type: {col_type}")
+
+    for _ in range(reader.unpack('<I')):
+        row = reader.unpack('<I')
+        values[row] = json.loads(reader.read_bytes().decode('utf-8'))
+
+    if presence is None:
+        return values, False
+    return [value if present else _MISSING for value, present in zip(values, presence)], True
+
+def _decode_typed(column, convert, fallback_code):
+    """Convert typed codes back to strings, converting each distinct code once"""
+    texts = {code: None if code == fallback_code else convert(code) for code in set(column)}
+    return list(map(texts.__getitem__, column))
+
+def _decode_strings(reader, count):
+    """Read a column of length-prefixed strings"""
+    lengths = reader.read_array('I', count)
+    blob = reader.read(sum(length for length in lengths if length != STRING_FALLBACK))
+    values = []
+    offset = 0
+    for length in lengths:
+        if length == STRING_FALLBACK:
+            values.append(None)
+        else:
+            values.append(blob[offset:offset + length].decode('utf-8'))
+            offset += length
+    return values
+
+def _percent_text(bits):
+    return _format_percent(struct.unpack('<f', struct.pack('<I', bits))[0])
+
+def _date_text(ordinal):
+    return '' if ordinal == DATE_EMPTY else datetime.date.fromordinal(ordinal).strftime(DATE_FORMAT)
+
+def _int_text(number):
+    return '' if number == INT_EMPTY else str(number)
+
+# Low-level helpers
+class _StringTable:
+    """Interned strings, stored once per snapshot"""
+
+    def __init__(self):
+        self.values = []
+        self.index = {}
+
+    def intern(self, value):
+        if value not in self.index:
+            self.index[value] = len(self.values)
+            self.values.append(value)
+        return self.index[value]
+
+
+class _Reader:
+    """Sequential reader over a bytes buffer"""
+
+    def __init__(self, data, offset=0):
+        self.data = memoryview(data)
+        self.offset = offset
+
+    def read(self, size):
+        if self.offset + size > len(self.data):
+            raise SnapshotError("Truncated snapshot")
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return bytes(chunk)
+
+    def unpack(self, fmt):
+        values = struct.unpack(fmt, self.read(struct.calcsize(fmt)))
+        return values[0] if len(values) == 1 else values
+
+    def read_bytes(self):
+        return self.read(self.unpack('<I'))
+
+    def read_array(self, typecode, count):
+        column = array(typecode)
+        column.frombytes(self.read(column.itemsize * count))
+        if sys.byteorder == 'big':
+            column.byteswap()
+        return column
+
+
+def _write_bytes(out, value):
+    out += struct.pack('<I', len(value))
+    out += value
+
+def _array_bytes(column):
+    if sys.byteorder == 'big':
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
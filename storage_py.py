@@ -0,0 +1,671 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+from urllib.parse import quote
+
+from config_py import (
+    STORAGE_BACKEND, USERS_FILE, SQLITE_FILE, JOURNAL_FILE, JOURNAL_COMPACT_BYTES,
+    SHARD_INDEX_FILE, SHARD_DIR, SHARD_FORMAT
+)
+from snapshot_py import encode_snapshot, decode_snapshot
+
+# Keys of a project record that are stored as separate rows
+PROJECT_ITEM_KEYS = ('tasks', 'milestones')
+
+# Project saves accept an optional changes dictionary describing what was touched:
+#   {'meta': bool, 'tasks': (positions, length), 'milestones': (positions, length)}
+# where positions lists the changed records and length is the new record count.
+# Without it the whole project is treated as changed.
+
+# Storage backends for user and project data
+class JsonStorage:
+    """Store all users and projects in a single JSON file"""
+
+    def __init__(self, path=USERS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load_users(self):
+        """Load the users dictionary"""
+        with self._lock:
+            return _read_json(self.path)
+
+    def save_users(self, users):
+        """Save the whole users dictionary"""
+        with self._lock:
+            _atomic_write_json(self.path, snapshot_users(users))
+
+    def load_project_items(self, username, project_id):
+        """Projects are loaded eagerly, so there is nothing to load on demand"""
+        return None
+
+    def save_user(self, users, username):
+        """Save a single user (the JSON file is always rewritten in full)"""
+        self.save_users(users)
+
+    def save_project(self, users, username, project_id, changes=None):
+        """Save a single project (the JSON file is always rewritten in full)"""
+        self.save_users(users)
+
+    def save_projects(self, users, username, project_ids):
+        """Save several projects of a user with a single rewrite of the file"""
+        self.save_users(users)
+
+
+class SQLiteStorage:
+    """Store users, projects, tasks and milestones as rows in an embedded SQLite database"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            meta TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS projects (
+            username TEXT NOT NULL,
+            project_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            meta TEXT NOT NULL,
+            PRIMARY KEY (username, project_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_projects_name ON projects (username, name);
+        CREATE INDEX IF NOT EXISTS idx_projects_created ON projects (username, created_at);
+        CREATE TABLE IF NOT EXISTS tasks (
+            username TEXT NOT NULL,
+            project_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (username, project_id, position)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS milestones (
+            username TEXT NOT NULL,
+            project_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (username, project_id, position)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path=SQLITE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self.SCHEMA)
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+    def load_users(self):
+        """Load the users dictionary"""
+        with self._lock:
+            users = {}
+            for username, meta in self._conn.execute('SELECT username, meta FROM users'):
+                user = json.loads(meta)
+                user['projects'] = {}
+                users[username] = user
+
+            for username, project_id, meta in self._conn.execute('SELECT username, project_id, meta FROM projects'):
+                project = json.loads(meta)
+                for key in PROJECT_ITEM_KEYS:
+                    project[key] = []
+                if username in users:
+                    users[username]['projects'][project_id] = project
+
+            for key in PROJECT_ITEM_KEYS:
+                rows = self._conn.execute(
+                    f'SELECT username, project_id, data FROM {key} ORDER BY username, project_id, position'
+                )
+                for username, project_id, data in rows:
+                    project = users.get(username, {}).get('projects', {}).get(project_id)
+                    if project is not None:
+                        project[key].append(json.loads(data))
+
+            return users
+
+    def load_project_items(self, username, project_id):
+        """Projects are loaded eagerly, so there is nothing to load on demand"""
+        return None
+
+    def save_users(self, users):
+        """Save the whole users dictionary"""
+        with self._lock, self._transaction():
+            users = snapshot_users(users)
+            for username in users:
+                self._write_user(users, username)
+                for project_id in users[username]['projects']:
+                    self._write_project(users, username, project_id)
+
+    def save_user(self, users, username):
+        """Save a user record without touching its projects"""
+        with self._lock, self._transaction():
+            self._write_user(users, username)
+
+    def save_project(self, users, username, project_id, changes=None):
+        """Save a project, writing only the task and milestone rows that changed"""
+        with self._lock, self._transaction():
+            if changes is None:
+                self._write_project(users, username, project_id)
+            else:
+                self._write_project_changes(users, username, project_id, changes)
+
+    def save_projects(self, users, username, project_ids):
+        """Save a user and several of their projects in a single transaction"""
+        with self._lock, self._transaction():
+            self._write_user(users, username)
+            for project_id in project_ids:
+                self._write_project(users, username, project_id)
+
+    def _transaction(self):
+        return _Transaction(self._conn)
+
+    def _write_user(self, users, username):
+        meta = {key: value for key, value in users[username].items() if key != 'projects'}
+        self._conn.execute(
+            'INSERT OR REPLACE INTO users (username, meta) VALUES (?, ?)',
+            (username, json.dumps(meta))
+        )
+
+    def _write_project(self, users, username, project_id):
+        project = users[username]['projects'][project_id]
+        self._write_project_meta(username, project_id, project)
+        for key in PROJECT_ITEM_KEYS:
+            self._write_items(key, username, project_id, project.get(key, []))
+
+    def _write_project_changes(self, users, username, project_id, changes):
+        """Write only the records listed in a changes dictionary"""
+        project = users[username]['projects'][project_id]
+        if changes.get('meta'):
+            self._write_project_meta(username, project_id, project)
+
+        for key in PROJECT_ITEM_KEYS:
+            if key not in changes:
+                continue
+            positions, length = changes[key]
+            items = project.get(key, [])
+            if positions:
+                self._conn.executemany(
+                    f'INSERT OR REPLACE INTO {key} (username, project_id, position, data) VALUES (?, ?, ?, ?)',
+                    [(username, project_id, position, json.dumps(items[position])) for position in positions]
+                )
+            self._conn.execute(
+                f'DELETE FROM {key} WHERE username = ? AND project_id = ? AND position >= ?',
+                (username, project_id, length)
+            )
+
+    def _write_project_meta(self, username, project_id, project):
+        meta = {key: value for key, value in project.items() if key not in PROJECT_ITEM_KEYS}
+        self._conn.execute(
+            'INSERT OR REPLACE INTO projects (username, project_id, name, created_at, meta) VALUES (?, ?, ?, ?, ?)',
+            (username, project_id, project.get('name', ''), project.get('created_at', ''), json.dumps(meta))
+        )
+
+    def _write_items(self, table, username, project_id, items):
+        """Diff items against the stored rows by position and write only the differences"""
+        stored = dict(self._conn.execute(
+            f'SELECT position, data FROM {table} WHERE username = ? AND project_id = ?',
+            (username, project_id)
+        ))
+
+        changed = []
+        for position, item in enumerate(items):
+            data = json.dumps(item)
+            if stored.get(position) != data:
+                changed.append((username, project_id, position, data))
+
+        if changed:
+            self._conn.executemany(
+                f'INSERT OR REPLACE INTO {table} (username, project_id, position, data) VALUES (?, ?, ?, ?)',
+                changed
+            )
+
+        if len(stored) > len(items):
+            self._conn.execute(
+                f'DELETE FROM {table} WHERE username = ? AND project_id = ? AND position >= ?',
+                (username, project_id, len(items))
+            )
+
+
+class JournalStorage:
+    """Store a JSON snapshot plus an append-only journal of changes made since the snapshot
+
+    Project saves append one record per changed task or milestone instead of
+    rewriting the snapshot. Once the journal grows past a size threshold it is
+    folded into a new snapshot by a background thread. Replaying a record twice
+    has no effect, so a crash in the middle of a compaction loses nothing.
+    """
+
+    def __init__(self, path=USERS_FILE, journal_path=JOURNAL_FILE, compact_bytes=JOURNAL_COMPACT_BYTES):
+        self.path = path
+        self.journal_path = journal_path
+        self.compact_bytes = compact_bytes
+        self._lock = threading.Lock()
+        # Held for a whole compaction, so that only one runs at a time
+        self._compact_lock = threading.Lock()
+        self._compactor = None
+        # Hashes of the last persisted form of every record, used to compute deltas
+        self._persisted = {}
+
+    def load_users(self):
+        """Load the snapshot and replay the journal on top of it"""
+        with self._lock:
+            users = _read_json(self.path)
+            _replay_journal(users, self.journal_path)
+            self._persisted = {}
+            for username in users:
+                self._remember_user(users, username)
+                for project_id in users[username]['projects']:
+                    self._remember_project(users, username, project_id)
+            return users
+
+    def load_project_items(self, username, project_id):
+        """Projects are loaded eagerly, so there is nothing to load on demand"""
+        return None
+
+    def save_users(self, users):
+        """Write a fresh snapshot and empty the journal"""
+        self.wait_for_compaction()
+        with self._compact_lock, self._lock:
+            users = snapshot_users(users)
+            _atomic_write_json(self.path, users)
+            open(self.journal_path, 'w').close()
+            self._persisted = {}
+            for username in users:
+                self._remember_user(users, username)
+                for project_id in users[username]['projects']:
+                    self._remember_project(users, username, project_id)
+
+    def save_user(self, users, username):
+        """Append the user record to the journal if it changed"""
+        with self._lock:
+            self._append(self._user_deltas(users, username))
+        self._maybe_compact()
+
+    def save_project(self, users, username, project_id, changes=None):
+        """Append the changed project records to the journal"""
+        with self._lock:
+            self._append(self._project_deltas(users, username, project_id, changes))
+        self._maybe_compact()
+
+    def save_projects(self, users, username, project_ids):
+        """Append the records of several projects to the journal in a single write"""
+        with self._lock:
+            deltas = self._user_deltas(users, username)
+            for project_id in project_ids:
+                deltas.extend(self._project_deltas(users, username, project_id))
+            self._append(deltas)
+        self._maybe_compact()
+
+    def wait_for_compaction(self):
+        """Block until a running compaction has finished"""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def _user_deltas(self, users, username):
+        meta = {key: value for key, value in users[username].items() if key != 'projects'}
+        digest = hash(json.dumps(meta, sort_keys=True))
+        if self._persisted.get(('user', username)) == digest:
+            return []
+        self._persisted[('user', username)] = digest
+        return [{'op': 'user', 'username': username, 'data': meta}]
+
+    def _project_deltas(self, users, username, project_id, changes=None):
+        deltas = self._user_deltas(users, username) if ('user', username) not in self._persisted else []
+
+        project = users[username]['projects'][project_id]
+        new_project = ('project', username, project_id) not in self._persisted
+        if changes is None or changes.get('meta') or new_project:
+            meta = {key: value for key, value in project.items() if key not in PROJECT_ITEM_KEYS}
+            digest = hash(json.dumps(meta, sort_keys=True))
+            if self._persisted.get(('project', username, project_id)) != digest:
+                self._persisted[('project', username, project_id)] = digest
+                deltas.append({'op': 'project', 'username': username, 'project_id': project_id, 'data': meta})
+
+        for key in PROJECT_ITEM_KEYS:
+            if changes is not None and key not in changes:
+                continue
+            items = project.get(key, [])
+            persisted = self._persisted.setdefault((key, username, project_id), [])
+            positions = range(len(items)) if changes is None else changes[key][0]
+            for position in positions:
+                item = items[position]
+                digest = hash(json.dumps(item, sort_keys=True))
+                if position < len(persisted) and persisted[position] == digest:
+                    continue
+                if position >= len(persisted):
+                    persisted.extend([None] * (position + 1 - len(persisted)))
+                persisted[position] = digest
+                deltas.append({
+                    'op': 'set_item', 'kind': key, 'username': username,
+                    'project_id': project_id, 'position': position, 'data': item
+                })
+            if len(persisted) > len(items):
+                del persisted[len(items):]
+                deltas.append({
+                    'op': 'truncate_items', 'kind': key, 'username': username,
+                    'project_id': project_id, 'length': len(items)
+                })
+
+        return deltas
+
+    def _remember_user(self, users, username):
+        meta = {key: value for key, value in users[username].items() if key != 'projects'}
+        self._persisted[('user', username)] = hash(json.dumps(meta, sort_keys=True))
+
+    def _remember_project(self, users, username, project_id):
+        project = users[username]['projects'][project_id]
+        meta = {key: value for key, value in project.items() if key not in PROJECT_ITEM_KEYS}
+        self._persisted[('project', username, project_id)] = hash(json.dumps(meta, sort_keys=True))
+        for key in PROJECT_ITEM_KEYS:
+            self._persisted[(key, username, project_id)] = [
+                hash(json.dumps(item, sort_keys=True)) for item in project.get(key, [])
+            ]
+
+    def _append(self, deltas):
+        if not deltas:
+            return
+        with open(self.journal_path, 'a') as f:
+            f.write(''.join(json.dumps(delta) + '\n' for delta in deltas))
+
+    def _maybe_compact(self):
+        try:
+            journal_size = os.path.getsize(self.journal_path)
+        except OSError:
+            return
+        if journal_size < self.compact_bytes:
+            return
+        # Check and start under the lock, so that concurrent appenders start a single compactor
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self.compact, daemon=True)
+            self._compactor.start()
+
+    def compact(self):
+        """Fold the journal into a new snapshot"""
+        with self._compact_lock:
+            with self._lock:
+                journal_end = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+
+            # Rebuild the state from files only, so the live users dictionary is never read concurrently
+            users = _read_json(self.path)
+            _replay_journal(users, self.journal_path, journal_end)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or '.', prefix=os.path.basename(self.path) + '.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(users, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                with self._lock:
+                    # Keep the records appended while the snapshot was being written
+                    with open(self.journal_path, 'rb') as f:
+                        f.seek(journal_end)
+                        remainder = f.read()
+                    os.replace(tmp_path, self.path)
+                    with open(self.journal_path, 'wb') as f:
+                        f.write(remainder)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+
+class ShardedStorage:
+    """Store a small index of users and project metadata plus one file per project
+
+    The index holds everything except tasks and milestones, which live in
+    <projects_dir>/<username>/<project_id>.json, or .pmsnap when the binary
+    snapshot format is selected. load_users reads only the index; a project's
+    tasks and milestones are read by load_project_items when it is opened.
+    """
+
+    def __init__(self, index_path=SHARD_INDEX_FILE, projects_dir=SHARD_DIR, shard_format=SHARD_FORMAT):
+        if shard_format not in ('json', 'binary'):
+            raise ValueError(f"Unknown shard format: {shard_format}")
+        self.index_path = index_path
+        self.projects_dir = projects_dir
+        self.shard_format = shard_format
+        self._lock = threading.Lock()
+
+    def load_users(self):
+        """Load users and project metadata, without tasks or milestones"""
+        with self._lock:
+            return _read_json(self.index_path)
+
+    def load_project_items(self, username, project_id):
+        """Load the tasks and milestones of a project"""
+        path = self._shard_path(username, project_id)
+        with self._lock:
+            if self.shard_format == 'binary':
+                items = {}
+                if os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        items = decode_snapshot(f.read())
+            else:
+                items = _read_json(path)
+        return {key: items.get(key, []) for key in PROJECT_ITEM_KEYS}
+
+    def save_users(self, users):
+        """Save the index and every loaded project"""
+        with self._lock:
+            users = snapshot_users(users)
+            for username in users:
+                for project_id, project in users[username]['projects'].items():
+                    self._write_shard(username, project_id, project)
+            self._write_index(users)
+
+    def save_user(self, users, username):
+        """Save a user record, which only touches the index"""
+        with self._lock:
+            self._write_index(users)
+
+    def save_project(self, users, username, project_id, changes=None):
+        """Save a project's shard, and the index if its metadata changed"""
+        project = users[username]['projects'][project_id]
+        with self._lock:
+            if changes is None or any(key in changes for key in PROJECT_ITEM_KEYS):
+                self._write_shard(username, project_id, project)
+            if changes is None or changes.get('meta'):
+                self._write_index(users)
+
+    def save_projects(self, users, username, project_ids):
+        """Save the shards of several projects and rewrite the index once"""
+        with self._lock:
+            for project_id in project_ids:
+                self._write_shard(username, project_id, users[username]['projects'][project_id])
+            self._write_index(users)
+
+    def _shard_path(self, username, project_id):
+        extension = '.pmsnap' if self.shard_format == 'binary' else '.json'
+        return os.path.join(self.projects_dir, quote(username, safe=''), quote(project_id, safe='') + extension)
+
+    def _write_shard(self, username, project_id, project):
+        # Projects that were never opened have nothing new to write
+        if not all(key in project for key in PROJECT_ITEM_KEYS):
+            return
+        path = self._shard_path(username, project_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        items = {key: project[key] for key in PROJECT_ITEM_KEYS}
+        if self.shard_format == 'binary':
+            _atomic_write_bytes(path, encode_snapshot(items))
+        else:
+            _atomic_write_json(path, items)
+
+    def _write_index(self, users):
+        index = {}
+        for username, user in snapshot_users(users).items():
+            index[username] = {key: value for key, value in user.items() if key != 'projects'}
+            index[username]['projects'] = {
+                project_id: {key: value for key, value in project.items() if key not in PROJECT_ITEM_KEYS}
+                for project_id, project in user['projects'].items()
+            }
+        _atomic_write_json(self.index_path, index)
+
+
+def snapshot_users(users):
+    """Copy the containers of a users dictionary so it can be serialized while sessions change it
+
+    Sessions add users, projects and records under their own user's lock, so
+    walking the live dictionary from another thread can fail part way. Each
+    dictionary and list is copied here with a single C-level call, which no
+    other thread can interleave with. Records themselves are shared, as they
+    are replaced rather than edited in place.
+    """
+    snapshot = {}
+    for username, user in users.copy().items():
+        user = user.copy()
+        projects = {}
+        for project_id, project in user.get('projects', {}).copy().items():
+            project = project.copy()
+            for key in PROJECT_ITEM_KEYS:
+                if key in project:
+                    project[key] = list(project[key])
+            projects[project_id] = project
+        user['projects'] = projects
+        snapshot[username] = user
+    return snapshot
+
+def _read_json(path):
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+    return {}
+
+def _atomic_write_json(path, data):
+    """Write JSON to a temporary file and rename it over the target"""
+    _atomic_write(path, 'w', lambda f: json.dump(data, f))
+
+def _atomic_write_bytes(path, data):
+    """Write bytes to a temporary file and rename it over the target"""
+    _atomic_write(path, 'wb', lambda f: f.write(data))
+
+def _atomic_write(path, mode, write):
+    """Write a file through a temporary file of its own in the target's directory
+
+    Each write gets a unique temporary file, so concurrent writers never
+    rename each other's half-written files into place.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _replay_journal(users, journal_path, end=None):
+    """Apply journal records to a users dictionary in place"""
+    if not os.path.exists(journal_path):
+        return
+    with open(journal_path, 'rb') as f:
+        content = f.read() if end is None else f.read(end)
+
+    for line in content.decode('utf-8').splitlines():
+        try:
+            delta = json.loads(line)
+        except ValueError:
+            # A torn final record from an interrupted write
+            continue
+
+        op = delta['op']
+        if op == 'user':
+            user = users.setdefault(delta['username'], {'projects': {}})
+            user.update(delta['data'])
+            continue
+
+        projects = users.setdefault(delta['username'], {'projects': {}})['projects']
+        if op == 'project':
+            project = projects.setdefault(delta['project_id'], {key: [] for key in PROJECT_ITEM_KEYS})
+            project.update(delta['data'])
+        elif op == 'set_item':
+            items = projects[delta['project_id']].setdefault(delta['kind'], [])
+            position = delta['position']
+            if position < len(items):
+                items[position] = delta['data']
+            else:
+                items.append(delta['data'])
+        elif op == 'truncate_items':
+            items = projects[delta['project_id']].setdefault(delta['kind'], [])
+            del items[delta['length']:]
+
+
+class _Transaction:
+    """Context manager running a block inside a single SQLite transaction"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute('COMMIT')
+        else:
+            self.conn.execute('ROLLBACK')
+        return False
+
+
+def create_storage(backend=STORAGE_BACKEND):
+    """Create the storage backend selected in the configuration"""
+    if backend == 'json':
+        return JsonStorage()
+    if backend == 'sqlite':
+        return SQLiteStorage()
+    if backend == 'journal':
+        return JournalStorage()
+    if backend == 'sharded':
+        return ShardedStorage()
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+def migrate_json_to_sqlite(json_path=USERS_FILE, db_path=SQLITE_FILE):
+    """Copy an existing users.json store into a SQLite database"""
+    users = JsonStorage(json_path).load_users()
+    storage = SQLiteStorage(db_path)
+    try:
+        storage.save_users(users)
+    finally:
+        storage.close()
+
+    project_count = sum(len(user['projects']) for user in users.values())
+    return len(users), project_count
+
+def migrate_json_to_sharded(json_path=USERS_FILE, index_path=SHARD_INDEX_FILE, projects_dir=SHARD_DIR):
+    """Split an existing users.json store into an index file and per-project files"""
+    users = JsonStorage(json_path).load_users()
+    ShardedStorage(index_path, projects_dir).save_users(users)
+
+    project_count = sum(len(user['projects']) for user in users.values())
+    return len(users), project_count
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Migrate users.json into another storage backend")
+    parser.add_argument('json_path', nargs='?', default=USERS_FILE)
+    parser.add_argument('target', nargs='?', help="Database file (sqlite) or index file (sharded)")
+    parser.add_argument('--to', choices=['sqlite', 'sharded'], default='sqlite', dest='backend')
+    args = parser.parse_args()
+
+    if args.backend == 'sqlite':
+        target = args.target or SQLITE_FILE
+        user_count, project_count = migrate_json_to_sqlite(args.json_path, target)
+    else:
+        target = args.target or SHARD_INDEX_FILE
+        user_count, project_count = migrate_json_to_sharded(args.json_path, target)
+    print(f"Migrated {user_count} users and {project_count} projects to {target}")
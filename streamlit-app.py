@@ -7,6 +7,8 @@ from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_squared_error, r2_score
 import plotly.express as px
+import io
+from upload_cache_py import get_upload_cache
 
 # Set page config
 st.set_page_config(
@@ -50,7 +52,12 @@ if selection == "Data Upload & Exploration":
         
         if uploaded_file is not None:
             try:
-                df = pd.read_csv(uploaded_file)
+                # Reruns hand back the same file, so parse each distinct upload only once
+                df = get_upload_cache().get_or_parse(
+                    uploaded_file.getvalue(),
+                    lambda data: pd.read_csv(io.BytesIO(data)),
+                    'csv-1'
+                )
                 st.session_state.data = df
                 st.session_state.filename = uploaded_file.name
                 st.success(f"Successfully loaded: {uploaded_file.name}")
@@ -17,6 +17,11 @@ from streamlit_option_menu import option_menu
 import xlsxwriter
 import uuid
 import os
+from upload_cache_py import get_upload_cache, parsed_size
+from schema_py import TASK_SCHEMA
+
+# Version of the project plan parser below; bump it whenever its output changes
+PLAN_PARSER_VERSION = 'pm-app-excel-1'
 
 # Set page configuration
 st.set_page_config(
@@ -162,6 +167,8 @@ if 'selected_task' not in st.session_state:
     st.session_state['selected_task'] = None
 if 'show_task_details' not in st.session_state:
     st.session_state['show_task_details'] = False
+if 'imported_uploads' not in st.session_state:
+    st.session_state['imported_uploads'] = {}
 
 # Generate dummy users for demo
 users = {
@@ -210,12 +217,29 @@ def login_screen():
         st.markdown("</div>", unsafe_allow_html=True)
 
 # File Uploader and Processor
+def _iso_dates(cells, dates):
+    """Format parsed dates as YYYY-MM-DD, keeping cells that are not dates as written"""
+    formatted = dates.map(lambda date: date.strftime("%Y-%m-%d") if date is not None else None)
+    return formatted.where(dates.notna(), cells.where(cells.notna(), '').map(str))
+
 def file_uploader():
     uploaded_file = st.file_uploader("Upload Project Plan Excel file", type=['xlsx', 'xls'])
     
     if uploaded_file is not None:
         try:
-            df = pd.read_excel(uploaded_file, engine='openpyxl')
+            data = uploaded_file.getvalue()
+            upload_cache = get_upload_cache()
+            upload_key = upload_cache.key(data, PLAN_PARSER_VERSION)
+            
+            # The uploader hands back the same file on every rerun; only create its project once
+            if upload_key in st.session_state['imported_uploads']:
+                st.info(f"This file was already imported as project '{st.session_state['imported_uploads'][upload_key]}'")
+                return None
+            
+            df = upload_cache.get(upload_key)
+            if df is None:
+                df = pd.read_excel(io.BytesIO(data), engine='openpyxl')
+                upload_cache.put(upload_key, df, parsed_size(df))
             st.success("File successfully uploaded!")
             
             # Process the file and create a new project
@@ -231,95 +255,56 @@ def file_uploader():
                 'resources': []
             }
             
-            # Find the tasks in the dataframe
-            if 'TASK TITLE' in df.columns or 'Task Title' in df.columns:
-                task_title_col = 'TASK TITLE' if 'TASK TITLE' in df.columns else 'Task Title'
-                
-                # Get other potential columns
-                potential_columns = {
-                    'WBS': ['WBS', 'wbs', 'ID', 'id'],
-                    'DESCRIPTION': ['TASK DESCRIPTION', 'Task Description', 'Description'],
-                    'DEPENDENCIES': ['DEPENDENCIES', 'Dependencies', 'Predecessors'],
-                    'OWNER': ['TASK OWNER', 'Task Owner', 'Owner', 'Resource'],
-                    'COMPLETE': ['PCT OF TASK COMPLETE', '% Complete', 'Complete'],
-                    'START': ['SCHEDULED START', 'Start Date', 'Start'],
-                    'FINISH': ['SCHEDULED FINISH', 'Finish Date', 'Finish'],
-                    'DURATION': ['DURATION', 'Duration']
-                }
+            # Find the tasks in the dataframe, resolving the column headers once
+            schema = TASK_SCHEMA.resolve(df.columns)
+            if schema.found('TASK TITLE'):
+                columns = schema.frame_columns(df, first_row=2)
+                titles = columns['TASK TITLE']
+                keep = (titles.notna() & (titles != '')).astype(bool)
+                columns = {name: column[keep] for name, column in columns.items()}
+                parsed, errors = TASK_SCHEMA.parse(columns)
+                if errors:
+                    st.warning(f"{len(errors)} cells could not be read")
+                    st.dataframe(pd.DataFrame(errors).astype({'value': str}))
                 
-                column_mapping = {}
-                for key, potential_names in potential_columns.items():
-                    for name in potential_names:
-                        if name in df.columns:
-                            column_mapping[key] = name
-                            break
+                # Build the task fields a whole column at a time
+                fields = {'title': titles[keep]}
+                if schema.found('WBS'):
+                    fields['wbs'] = columns['WBS'].map(str).where(columns['WBS'].notna(), '')
+                if schema.found('TASK DESCRIPTION'):
+                    fields['description'] = columns['TASK DESCRIPTION'].where(columns['TASK DESCRIPTION'].notna(), '')
+                if schema.found('DEPENDENCIES'):
+                    fields['dependencies'] = columns['DEPENDENCIES'].map(str).where(columns['DEPENDENCIES'].notna(), '')
+                if schema.found('TASK OWNER'):
+                    fields['owner'] = columns['TASK OWNER'].where(columns['TASK OWNER'].notna(), '')
+                    
+                    # Add each owner to the resources once
+                    owners = fields['owner'][fields['owner'] != '']
+                    for owner in owners.drop_duplicates():
+                        project_info['resources'].append({
+                            'id': len(project_info['resources']) + 1,
+                            'name': owner,
+                            'role': 'Team Member',
+                            'allocation': []
+                        })
+                if schema.found('PCT OF TASK COMPLETE'):
+                    fields['percentComplete'] = parsed['PCT OF TASK COMPLETE'].fillna(0)
+                if schema.found('SCHEDULED START'):
+                    fields['startDate'] = _iso_dates(columns['SCHEDULED START'], parsed['SCHEDULED START'])
+                if schema.found('SCHEDULED FINISH'):
+                    fields['endDate'] = _iso_dates(columns['SCHEDULED FINISH'], parsed['SCHEDULED FINISH'])
+                if schema.found('DURATION'):
+                    durations = parsed['DURATION']
+                    fields['duration'] = durations.fillna(0).astype(int)
+                    
+                    # Check if it's a milestone (duration 0 or 1)
+                    fields['milestone'] = (durations <= 1) & durations.notna()
                 
-                # Process each task
-                for idx, row in df.iterrows():
-                    if pd.notna(row[task_title_col]) and row[task_title_col] != '':
-                        task = {
-                            'id': len(project_info['tasks']) + 1,
-                            'title': row[task_title_col]
-                        }
-                        
-                        # Add other fields if they exist
-                        if 'WBS' in column_mapping:
-                            task['wbs'] = str(row[column_mapping['WBS']]) if pd.notna(row[column_mapping['WBS']]) else ''
-                        
-                        if 'DESCRIPTION' in column_mapping:
-                            task['description'] = row[column_mapping['DESCRIPTION']] if pd.notna(row[column_mapping['DESCRIPTION']]) else ''
-                        
-                        if 'DEPENDENCIES' in column_mapping:
-                            task['dependencies'] = str(row[column_mapping['DEPENDENCIES']]) if pd.notna(row[column_mapping['DEPENDENCIES']]) else ''
-                        
-                        if 'OWNER' in column_mapping:
-                            task['owner'] = row[column_mapping['OWNER']] if pd.notna(row[column_mapping['OWNER']]) else ''
-                            
-                            # Also add to resources if not already there
-                            if pd.notna(row[column_mapping['OWNER']]) and row[column_mapping['OWNER']] != '':
-                                resource_exists = False
-                                for resource in project_info['resources']:
-                                    if resource['name'] == row[column_mapping['OWNER']]:
-                                        resource_exists = True
-                                        break
-                                
-                                if not resource_exists:
-                                    project_info['resources'].append({
-                                        'id': len(project_info['resources']) + 1,
-                                        'name': row[column_mapping['OWNER']],
-                                        'role': 'Team Member',
-                                        'allocation': []
-                                    })
-                        
-                        if 'COMPLETE' in column_mapping:
-                            task['percentComplete'] = float(row[column_mapping['COMPLETE']]) if pd.notna(row[column_mapping['COMPLETE']]) else 0
-                        
-                        if 'START' in column_mapping:
-                            if pd.notna(row[column_mapping['START']]):
-                                if isinstance(row[column_mapping['START']], str):
-                                    task['startDate'] = row[column_mapping['START']]
-                                else:
-                                    task['startDate'] = row[column_mapping['START']].strftime("%Y-%m-%d")
-                            else:
-                                task['startDate'] = ''
-                        
-                        if 'FINISH' in column_mapping:
-                            if pd.notna(row[column_mapping['FINISH']]):
-                                if isinstance(row[column_mapping['FINISH']], str):
-                                    task['endDate'] = row[column_mapping['FINISH']]
-                                else:
-                                    task['endDate'] = row[column_mapping['FINISH']].strftime("%Y-%m-%d")
-                            else:
-                                task['endDate'] = ''
-                        
-                        if 'DURATION' in column_mapping:
-                            task['duration'] = int(row[column_mapping['DURATION']]) if pd.notna(row[column_mapping['DURATION']]) else 0
-                        
-                        # Check if it's a milestone (duration 0 or 1)
-                        if 'DURATION' in column_mapping:
-                            task['milestone'] = int(row[column_mapping['DURATION']]) <= 1 if pd.notna(row[column_mapping['DURATION']]) else False
-                        
-                        project_info['tasks'].append(task)
+                keys = list(fields)
+                for number, values in enumerate(zip(*(fields[key].tolist() for key in keys)), start=1):
+                    task = {'id': number}
+                    task.update(zip(keys, values))
+                    project_info['tasks'].append(task)
             
             # If no tasks were found, use sample data
             if len(project_info['tasks']) == 0:
@@ -493,6 +478,7 @@ def file_uploader():
             # Add the project to session state
             st.session_state['projects'].append(project_info)
             st.session_state['current_project'] = project_info
+            st.session_state['imported_uploads'][upload_key] = project_info['name']
             
             return project_info
             
@@ -0,0 +1,128 @@
+import datetime
+import numpy as np
+from dates_py import parse_date_column
+from wbs_index_py import WbsIndex
+
+# Day ordinal of the Unix epoch, to convert ordinals to numpy dates
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+# Ordinal used for a missing or unparseable date
+NO_DATE = 0
+
+# Code used for a task without an owner
+NO_OWNER = -1
+
+# Typed task columns
+class TaskStore:
+    """Typed, column-oriented view of a list of task records
+
+    Dates are held as day ordinals (NO_DATE when missing), completion as a
+    fraction, duration as whole days and owners as codes into the owners
+    list, all in numpy arrays with one entry per task. Values are parsed
+    exactly as the charts and metrics used to parse them per task, so the
+    columns can be read directly instead.
+
+    The WBS hierarchy is indexed in wbs_index. The store is also a sequence
+    of the original task dictionaries, so it can be handed to code that
+    expects the task list.
+    """
+
+    def __init__(self, tasks):
+        self.records = list(tasks)
+        self.wbs = [task['wbs'] for task in self.records]
+        self.titles = [task['title'] for task in self.records]
+        self.wbs_index = WbsIndex(self.wbs)
+        self.depth = np.array(self.wbs_index.depths, dtype=np.int32)
+
+        self.scheduled_start = _date_ordinals(self.records, 'scheduled_start')
+        self.scheduled_finish = _date_ordinals(self.records, 'scheduled_finish')
+        self.actual_start = _date_ordinals(self.records, 'actual_start')
+        self.actual_finish = _date_ordinals(self.records, 'actual_finish')
+
+        # Scheduled dates, falling back to actual dates
+        self.start = np.where(self.scheduled_start != NO_DATE, self.scheduled_start, self.actual_start)
+        self.finish = np.where(self.scheduled_finish != NO_DATE, self.scheduled_finish, self.actual_finish)
+
+        self.completion = _parsed_column(self.records, 'completion', _completion_value, np.float64)
+        self.duration = _parsed_column(self.records, 'duration', _duration_value, np.int64)
+
+        self.owners = []
+        owner_codes = {}
+        codes = []
+        for task in self.records:
+            owner = task['owner']
+            if not owner or not owner.strip():
+                codes.append(NO_OWNER)
+                continue
+            code = owner_codes.get(owner)
+            if code is None:
+                code = owner_codes[owner] = len(self.owners)
+                self.owners.append(owner)
+            codes.append(code)
+        self.owner_codes = np.array(codes, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def has_dates(self):
+        """Mask of tasks with both a start and a finish date"""
+        return (self.start != NO_DATE) & (self.finish != NO_DATE)
+
+    def has_owner(self):
+        """Mask of tasks assigned to an owner"""
+        return self.owner_codes != NO_OWNER
+
+    def wbs_rows(self, level=None, parent_wbs=None):
+        """Positions of tasks at a WBS level, optionally below a parent WBS, in task order"""
+        return np.array(self.wbs_index.descendants(parent_wbs, level), dtype=np.int64)
+
+
+def _date_ordinals(records, key):
+    dates = parse_date_column([task[key] for task in records])
+    return np.array([NO_DATE if date is None else date.toordinal() for date in dates], dtype=np.int64)
+
+def _parsed_column(records, key, parse, dtype):
+    """Parse a text column, parsing each distinct value once"""
+    parsed = {}
+    values = []
+    for task in records:
+        text = task[key]
+        value = parsed.get(text)
+        if value is None:
+            value = parsed[text] = parse(text)
+        values.append(value)
+    return np.array(values, dtype=dtype)
+
+def _completion_value(text):
+    if text and text.strip():
+        try:
+            return float(text.replace('%', '')) / 100
+        except ValueError:
+            return 0.0
+    return 0.0
+
+def _duration_value(text):
+    if text and text.strip():
+        try:
+            return int(text)
+        except ValueError:
+            return 0
+    return 0
+
+def ordinals_to_dates(ordinals):
+    """Convert day ordinals to a numpy datetime64 array"""
+    return (np.asarray(ordinals, dtype=np.int64) - EPOCH_ORDINAL).astype('datetime64[D]')
+
+def get_task_store(tasks):
+    """Get the typed store for a task list, reusing it until the tracked list changes"""
+    if isinstance(tasks, TaskStore):
+        return tasks
+    if hasattr(tasks, 'derived'):
+        return tasks.derived('task_store', TaskStore)
+    return TaskStore(tasks)
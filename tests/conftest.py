@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Add the repository root to the path so the tests can import the app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
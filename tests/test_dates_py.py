@@ -0,0 +1,32 @@
+import datetime
+
+import pandas as pd
+from dates_py import parse_date, parse_date_column
+
+def _dates(parsed):
+    return [None if pd.isna(value) else value for value in parsed]
+
+# Date column parsing
+def test_parse_date_column_with_invalid_dates():
+    values = pd.Series(['01/02/2024', 'TBD', '', '2024-03-15', 'not a date', '15/03/2024'])
+    parsed = parse_date_column(values)
+
+    assert _dates(parsed) == [
+        datetime.date(2024, 2, 1),
+        None,
+        None,
+        datetime.date(2024, 3, 15),
+        None,
+        datetime.date(2024, 3, 15)
+    ]
+
+def test_parse_date_column_matches_parse_date():
+    values = ['01/02/24', '13/01/2024', '02-28-2024', 'Mar 5, 2024', '5 March 2024', 'TBD', None, '']
+    parsed = parse_date_column(values)
+
+    assert _dates(parsed) == [parse_date(value) for value in values]
+
+def test_parse_date_column_without_valid_dates():
+    parsed = parse_date_column(['TBD', 'n/a'])
+
+    assert _dates(parsed) == [None, None]
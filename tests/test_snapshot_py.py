@@ -0,0 +1,29 @@
+import pytest
+from snapshot_py import SnapshotError, decode_snapshot, encode_snapshot
+
+def _round_trip(document):
+    return decode_snapshot(encode_snapshot(document))
+
+# Round trips
+@pytest.mark.parametrize('document', [
+    {'tasks': [{'owner': None}, {}]},
+    {'tasks': [{'owner': 'Ana'}, {}, {'owner': None}]},
+    {'tasks': [{'completion': '-0%'}, {'completion': '0%'}, {'completion': '12.5%'}, {'completion': 'half'}]},
+    {'tasks': [{'scheduled_start': '01/02/2024'}, {'scheduled_start': ''}, {'scheduled_start': '2024-02-01'}]},
+    {'tasks': [{'duration': '3'}, {'duration': ''}, {'duration': '03'}, {'duration': 4}]},
+    {'tasks': [{'title': 'Café'}, {'title': 'a\0b'}, {'title': ''}, {'title': None}]},
+    {'tasks': [{'id': '1', 'wbs': '1'}, {'wbs': '1.1', 'id': '2'}, {'id': '3'}]},
+    {'tasks': [{'tags': ['a', 'b']}, {'tags': []}]},
+    {'name': 'Plan', 'tasks': [], 'milestones': []},
+])
+def test_round_trip(document):
+    assert _round_trip(document) == document
+
+def test_round_trip_keeps_field_order():
+    document = {'tasks': [{'id': '1', 'title': 'Design', 'owner': 'Ana'}, {'id': '2', 'title': 'Build', 'owner': 'Ben'}]}
+
+    assert [list(task) for task in _round_trip(document)['tasks']] == [['id', 'title', 'owner']] * 2
+
+def test_decode_rejects_other_data():
+    with pytest.raises(SnapshotError):
+        decode_snapshot(b'{"tasks": []}')
@@ -0,0 +1,104 @@
+import os
+import threading
+
+import pytest
+from storage_py import JournalStorage, JsonStorage, ShardedStorage, _atomic_write_json, _read_json
+from user_store_py import SharedUserStore
+
+def _user(projects=0):
+    return {
+        'password': 'hash',
+        'projects': {
+            f'p{index}': {'name': f'Project {index}', 'tasks': [{'id': '1'}], 'milestones': []}
+            for index in range(projects)
+        }
+    }
+
+def _save_concurrently(store, writers=8, rounds=25, added_users=200):
+    """Save different users from several threads while another thread keeps adding users"""
+    for index in range(writers):
+        store.users[f'writer{index}'] = _user(projects=3)
+    errors = []
+
+    def save(username):
+        try:
+            for round_number in range(rounds):
+                with store.lock(username):
+                    store.users[username]['projects'][f'new{round_number}'] = {'name': 'New', 'tasks': [], 'milestones': []}
+                    store.save_project(username, f'new{round_number}')
+                store.save_user(username)
+        except Exception as e:
+            errors.append(e)
+
+    def add_users():
+        for index in range(added_users):
+            username = f'added{index}'
+            with store.lock(username):
+                store.users[username] = _user(projects=1)
+
+    threads = [threading.Thread(target=save, args=(f'writer{index}',)) for index in range(writers)]
+    threads.append(threading.Thread(target=add_users))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+# Concurrent saves
+def test_json_storage_concurrent_saves(tmp_path):
+    path = str(tmp_path / 'users.json')
+    store = SharedUserStore(JsonStorage(path), background=False)
+
+    assert _save_concurrently(store) == []
+
+    store.save_all()
+    users = JsonStorage(path).load_users()
+    assert len(users) == 8 + 200
+    assert len(users['writer0']['projects']) == 3 + 25
+    assert [name for name in os.listdir(tmp_path) if name != 'users.json'] == []
+
+def test_sharded_storage_concurrent_saves(tmp_path):
+    storage = ShardedStorage(str(tmp_path / 'index.json'), str(tmp_path / 'projects'))
+    store = SharedUserStore(storage, background=False)
+
+    assert _save_concurrently(store) == []
+
+    users = ShardedStorage(str(tmp_path / 'index.json'), str(tmp_path / 'projects')).load_users()
+    assert len(users['writer7']['projects']) == 3 + 25
+
+@pytest.mark.filterwarnings('error::pytest.PytestUnhandledThreadExceptionWarning')
+def test_journal_storage_compacts_during_concurrent_saves(tmp_path):
+    storage = JournalStorage(str(tmp_path / 'users.json'), str(tmp_path / 'journal.log'), compact_bytes=256)
+    store = SharedUserStore(storage, background=False)
+
+    assert _save_concurrently(store, added_users=0) == []
+    storage.wait_for_compaction()
+    storage.compact()
+
+    users = JournalStorage(str(tmp_path / 'users.json'), str(tmp_path / 'journal.log')).load_users()
+    assert sorted(users) == [f'writer{index}' for index in range(8)]
+    for username, user in users.items():
+        assert sorted(user['projects']) == sorted(f'new{round_number}' for round_number in range(25))
+    assert sorted(os.listdir(tmp_path)) == ['journal.log', 'users.json']
+
+# Atomic writes
+def test_atomic_writes_from_several_threads(tmp_path):
+    path = str(tmp_path / 'data.json')
+    errors = []
+
+    def write(number):
+        try:
+            for round_number in range(50):
+                _atomic_write_json(path, {'writer': number, 'round': round_number})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(number,)) for number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert set(_read_json(path)) == {'writer', 'round'}
+    assert os.listdir(tmp_path) == ['data.json']
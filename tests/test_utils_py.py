@@ -0,0 +1,63 @@
+import datetime
+import io
+
+from openpyxl import Workbook
+from schema_py import TASK_COLUMNS
+from utils_py import TASK_HEADER_ROW, read_excel_frames, read_excel_streaming
+
+# Excel plan readers
+def _plan_workbook():
+    workbook = Workbook()
+    tasks = workbook.active
+    for line in range(TASK_HEADER_ROW):
+        tasks.append([f'Project plan, line {line + 1}'])
+    tasks.append(TASK_COLUMNS)
+    tasks.append(['1', 'Design', 'Scope the work', None, 'Ana', '100%', '01/02/2024', '05/02/2024', None, None, None, 3])
+    tasks.append(['1.1', 'Review', None, 1, 'Ben', 0.5, datetime.datetime(2024, 2, 6), 'TBD', None, None, None, None])
+    tasks.append(['1.10', 'Sign off', None, '1.1', None, None, None, None, None, None, '#N/A', 2.0])
+    tasks.append([None, 'No WBS', None, None, None, None, None, None, None, None, None, 1])
+
+    milestones = workbook.create_sheet('Milestones')
+    milestones.append(['Milestones', 'Start Date', 'End Date', 'Key Milestones'])
+    milestones.append(['Kickoff', '01/02/2024', datetime.datetime(2024, 2, 1), 'Yes'])
+    milestones.append([None, '02/02/2024', None, None])
+    milestones.append(['Launch', 'soon', None, None])
+
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+def test_excel_readers_give_the_same_plan():
+    data = _plan_workbook()
+    frames = read_excel_frames(io.BytesIO(data))
+    streamed = read_excel_streaming(io.BytesIO(data))
+
+    assert frames == streamed
+
+    tasks, milestones, warnings = streamed
+    assert [task['wbs'] for task in tasks] == ['1', '1.1', '1.10']
+    assert [task['duration'] for task in tasks] == ['3', '', '2']
+    assert [task['dependencies'] for task in tasks] == ['', '1', '1.1']
+    assert [milestone['name'] for milestone in milestones] == ['Kickoff', 'Launch']
+    assert len(warnings) == 1
+
+def test_excel_readers_keep_cells_as_stored():
+    # A whole-number WBS reads as '1' rather than '1.0', and real date cells
+    # are formatted like date strings instead of being left blank
+    workbook = Workbook()
+    tasks = workbook.active
+    for line in range(TASK_HEADER_ROW):
+        tasks.append([f'Project plan, line {line + 1}'])
+    tasks.append(TASK_COLUMNS)
+    tasks.append([1, 'Design', None, None, None, None, datetime.datetime(2024, 2, 6), datetime.date(2024, 2, 9), None, None, None, None])
+    tasks.append([2, 'Build', None, 1, None, None, None, None, None, None, None, None])
+    workbook.create_sheet('Milestones').append(['Milestones', 'Start Date', 'End Date', 'Key Milestones'])
+    output = io.BytesIO()
+    workbook.save(output)
+    data = output.getvalue()
+
+    for tasks, _, _ in (read_excel_frames(io.BytesIO(data)), read_excel_streaming(io.BytesIO(data))):
+        assert [task['wbs'] for task in tasks] == ['1', '2']
+        assert tasks[1]['dependencies'] == '1'
+        assert tasks[0]['scheduled_start'] == '06/02/2024'
+        assert tasks[0]['scheduled_finish'] == '09/02/2024'
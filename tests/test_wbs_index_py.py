@@ -0,0 +1,22 @@
+from wbs_index_py import WbsIndex
+
+# Hierarchy queries
+def test_hierarchy_queries():
+    index = WbsIndex(['1', '1.1', '1.1.1', '1.2', '2', '2.1'])
+
+    assert index.depths == [1, 2, 3, 2, 1, 2]
+    assert index.children() == [0, 4]
+    assert index.children('1') == [1, 3]
+    assert index.descendants('1') == [1, 2, 3]
+    assert index.descendants('1', depth=3) == [2]
+    assert index.ancestors('1.1.1') == [0, 1]
+    assert index.ancestor_at('1.1.1', 2) == '1.1'
+
+def test_empty_wbs():
+    index = WbsIndex(['', '1', '1.1'])
+
+    assert index.children() == [0, 1]
+    assert index.descendants('') == []
+    assert index.descendants() == [0, 1, 2]
+    assert index.descendants('1') == [2]
+    assert index.ancestors('') == []
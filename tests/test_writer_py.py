@@ -0,0 +1,18 @@
+import logging
+
+from writer_py import BackgroundWriter
+
+class FailingStorage:
+    def save_user(self, users, username):
+        raise OSError("disk full")
+
+# Background writes
+def test_flush_at_exit_logs_errors(caplog):
+    writer = BackgroundWriter(FailingStorage(), delay=0)
+    writer.save_user({}, 'ana')
+
+    with caplog.at_level(logging.ERROR, logger='writer_py'):
+        writer._flush_at_exit()
+
+    assert 'disk full' in caplog.text
+    assert writer.take_errors() == []
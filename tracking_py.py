@@ -0,0 +1,133 @@
+# Change tracking for task and milestone collections
+class TrackedRecords(list):
+    """A list of records that remembers which positions changed since the last save
+
+    List operations that only touch one position (append, item assignment)
+    mark that position dirty. Operations that shift records around (insert,
+    delete, sort, ...) mark every position from the first affected one
+    onwards. Records edited in place are not seen, so they must be replaced
+    through item assignment instead.
+
+    Every change also advances a revision number, which derived() uses to
+    cache values computed from the records until they change again.
+    """
+
+    def __init__(self, records=(), persisted_length=None):
+        super().__init__(records)
+        self._dirty = set()
+        self._derived = {}
+        self.revision = 0
+        if persisted_length is None:
+            # Freshly loaded records, all of them already saved
+            self._dirty_from = len(self)
+            self._persisted_length = len(self)
+        else:
+            # A replacement for a collection that had persisted_length records
+            self._dirty_from = 0
+            self._persisted_length = persisted_length
+
+    def _mark(self, positions):
+        self._dirty.update(positions)
+        self.revision += 1
+
+    def _mark_from(self, position):
+        self._dirty_from = min(self._dirty_from, max(position, 0))
+        self.revision += 1
+
+    def _position(self, index):
+        return index + len(self) if index < 0 else index
+
+    def has_changes(self):
+        """Check whether anything changed since the last save"""
+        return bool(self._dirty) or self._dirty_from < len(self) or len(self) != self._persisted_length
+
+    def changes(self):
+        """Get the changed positions and the new length of the collection"""
+        positions = {position for position in self._dirty if position < len(self)}
+        positions.update(range(self._dirty_from, len(self)))
+        return sorted(positions), len(self)
+
+    def commit(self):
+        """Forget all changes after they have been saved"""
+        self._dirty = set()
+        self._dirty_from = len(self)
+        self._persisted_length = len(self)
+
+    def derived(self, key, build):
+        """Get a value computed from the records, calling build(records) again only after they changed"""
+        cached = self._derived.get(key)
+        if cached is None or cached[0] != self.revision:
+            cached = (self.revision, build(self))
+            self._derived[key] = cached
+        return cached[1]
+
+    # Mutating list operations
+    def append(self, record):
+        super().append(record)
+        self._mark((len(self) - 1,))
+
+    def extend(self, records):
+        start = len(self)
+        super().extend(records)
+        self._mark(range(start, len(self)))
+
+    def __iadd__(self, records):
+        self.extend(records)
+        return self
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            start = index.indices(len(self))[0]
+            super().__setitem__(index, value)
+            self._mark_from(start)
+        else:
+            super().__setitem__(index, value)
+            self._mark((self._position(index),))
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            start = index.indices(len(self))[0]
+        else:
+            start = self._position(index)
+        super().__delitem__(index)
+        self._mark_from(start)
+
+    def insert(self, index, record):
+        position = min(self._position(index), len(self))
+        super().insert(index, record)
+        self._mark_from(position)
+
+    def pop(self, index=-1):
+        position = self._position(index)
+        record = super().pop(index)
+        self._mark_from(position)
+        return record
+
+    def remove(self, record):
+        position = self.index(record)
+        super().remove(record)
+        self._mark_from(position)
+
+    def clear(self):
+        super().clear()
+        self._mark_from(0)
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._mark_from(0)
+
+    def reverse(self):
+        super().reverse()
+        self._mark_from(0)
+
+
+def track_records(records, persisted_length=None):
+    """Wrap a list of records for change tracking
+
+    Lists that are already tracked are returned unchanged. Without
+    persisted_length the records are taken to be already saved; otherwise the
+    list replaces a collection that had persisted_length saved records.
+    """
+    if isinstance(records, TrackedRecords):
+        return records
+    return TrackedRecords(records, persisted_length=persisted_length)
@@ -0,0 +1,59 @@
+import hashlib
+import sys
+
+import streamlit as st
+from cache_py import SizedLRUCache
+from config_py import UPLOAD_CACHE_BYTES
+
+# Number of records measured to estimate the size of a parsed record list
+RECORD_SAMPLE_SIZE = 100
+
+# Parsed upload cache
+class UploadCache(SizedLRUCache):
+    """Remember the parsed result of uploaded files across reruns and sessions
+
+    Entries are keyed by a hash of the upload's bytes and the version of the
+    parser that produced them, so an identical upload costs one hash instead
+    of a parse, and bumping a parser's version retires its old results. The
+    cache holds at most max_bytes of parsed results, counted by their
+    estimated size in memory, and evicts the least recently used entries
+    first. Cached results are shared and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes=UPLOAD_CACHE_BYTES):
+        super().__init__(max_bytes)
+
+    @staticmethod
+    def key(data, parser_version):
+        """Get the cache key of an upload's bytes for a parser version"""
+        return (hashlib.blake2b(data, digest_size=20).hexdigest(), parser_version)
+
+    def get_or_parse(self, data, parse, parser_version):
+        """Get the parsed result of an upload's bytes, calling parse(data) only on a miss"""
+        key = self.key(data, parser_version)
+        result = self.get(key)
+        if result is None:
+            result = parse(data)
+            self.put(key, result, parsed_size(result))
+        return result
+
+
+def _records_size(records):
+    """Estimate the memory taken by a list of records from a sample of them"""
+    sample = records[:RECORD_SAMPLE_SIZE]
+    if not sample or not isinstance(sample[0], dict):
+        return sys.getsizeof(records) + sum(sys.getsizeof(item) for item in records)
+
+    sample_size = sum(sys.getsizeof(record) + sum(sys.getsizeof(value) for value in record.values()) for record in sample)
+    return sys.getsizeof(records) + sample_size * len(records) // len(sample)
+
+def parsed_size(result):
+    """Estimate the memory taken by a parsed upload: a DataFrame, or a tuple of record lists and warnings"""
+    if hasattr(result, 'memory_usage'):
+        return int(result.memory_usage(deep=True).sum())
+    return sys.getsizeof(result) + sum(_records_size(part) for part in result)
+
+@st.cache_resource
+def get_upload_cache():
+    """Get the upload cache shared by every session of the process"""
+    return UploadCache()
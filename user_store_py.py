@@ -0,0 +1,123 @@
+import threading
+
+from catalog_py import ProjectCatalog
+from config_py import ASYNC_WRITES
+from writer_py import BackgroundWriter
+
+# Process-wide user store
+class SharedUserStore:
+    """Hold a single users dictionary shared by every session of the process
+
+    Sessions read the dictionary directly and write through the store, which
+    serializes writers per user and stamps every user and project with a
+    version number so sessions can tell when their view has gone stale.
+    With background writes enabled, saves are handed to a writer thread.
+    """
+
+    def __init__(self, storage, background=ASYNC_WRITES):
+        self.users = storage.load_users()
+        self.storage = BackgroundWriter(storage, lock_for=self.lock) if background else storage
+        self._locks_guard = threading.Lock()
+        self._locks = {}
+        self._versions = {}
+        self._catalogs = {}
+        # Persistence counters, to confirm how much each save writes
+        self.stats = {'saves': 0, 'skipped_saves': 0, 'records_written': 0, 'last_records_written': 0}
+
+    def lock(self, username):
+        """Get the lock serializing writes to a user and their projects"""
+        with self._locks_guard:
+            if username not in self._locks:
+                self._locks[username] = threading.RLock()
+            return self._locks[username]
+
+    def version(self, username, project_id=None):
+        """Get the version stamp of a user or one of their projects"""
+        return self._versions.get((username, project_id), 0)
+
+    def bump(self, username, project_id=None):
+        """Advance the version stamp of a user, and of a project if given"""
+        with self._locks_guard:
+            self._versions[(username, None)] = self._versions.get((username, None), 0) + 1
+            if project_id is not None:
+                self._versions[(username, project_id)] = self._versions.get((username, project_id), 0) + 1
+            return self._versions[(username, project_id)]
+
+    def catalog(self, username):
+        """Get the project catalog of a user, building it on first use"""
+        catalog = self._catalogs.get(username)
+        if catalog is None:
+            with self.lock(username):
+                catalog = self._catalogs.get(username)
+                if catalog is None:
+                    catalog = ProjectCatalog(self.users[username]['projects'])
+                    self._catalogs[username] = catalog
+        return catalog
+
+    def ensure_project_loaded(self, username, project_id):
+        """Load a project's tasks and milestones if the backend loads them on demand"""
+        project = self.users[username]['projects'][project_id]
+        if 'tasks' in project and 'milestones' in project:
+            return project
+
+        with self.lock(username):
+            if 'tasks' not in project or 'milestones' not in project:
+                items = self.storage.load_project_items(username, project_id)
+                if items is not None:
+                    project.update(items)
+        return project
+
+    def save_all(self):
+        """Persist the whole users dictionary"""
+        with self._locks_guard:
+            self.storage.save_users(self.users)
+
+    def save_user(self, username):
+        """Persist a user record and advance its version"""
+        with self.lock(username):
+            self.storage.save_user(self.users, username)
+            return self.bump(username)
+
+    def save_project(self, username, project_id, changes=None):
+        """Persist a project, or only the records listed in changes, and advance its version"""
+        with self.lock(username):
+            self.storage.save_project(self.users, username, project_id, changes)
+            self._count_save(self.users[username]['projects'][project_id], changes)
+            return self.bump(username, project_id)
+
+    def save_projects(self, username, project_ids):
+        """Persist several new or replaced projects of a user in one batched write"""
+        with self.lock(username):
+            self.storage.save_projects(self.users, username, project_ids)
+            projects = self.users[username]['projects']
+            for project_id in project_ids:
+                self._count_save(projects[project_id], None)
+                self.bump(username, project_id)
+
+    def flush(self):
+        """Block until all saves are on disk"""
+        if isinstance(self.storage, BackgroundWriter):
+            self.storage.flush()
+
+    def take_write_errors(self):
+        """Get and clear the errors raised by background saves"""
+        if isinstance(self.storage, BackgroundWriter):
+            return self.storage.take_errors()
+        return []
+
+    def record_skipped_save(self):
+        """Count a save that was skipped because nothing had changed"""
+        with self._locks_guard:
+            self.stats['skipped_saves'] += 1
+
+    def _count_save(self, project, changes):
+        if changes is None:
+            records = 1 + len(project.get('tasks', [])) + len(project.get('milestones', []))
+        else:
+            records = int(bool(changes.get('meta')))
+            records += sum(len(changes[key][0]) for key in ('tasks', 'milestones') if key in changes)
+
+        with self._locks_guard:
+            self.stats['saves'] += 1
+            self.stats['records_written'] += records
+            self.stats['last_records_written'] = records
@@ -0,0 +1,103 @@
+import numpy as np
+from task_store_py import get_task_store, ordinals_to_dates, NO_DATE
+from config_py import UTILIZATION_MAX_COLUMNS
+
+# Time buckets the utilization can be rolled up to, from finest to coarsest
+GRANULARITIES = ('day', 'week', 'month', 'quarter')
+
+# Resource utilization
+class ResourceUtilization:
+    """Number of tasks each resource works on per day over the span of a plan
+
+    matrix has one row per owner, in the order of owners, and one column per
+    calendar day from first_day (a day ordinal) to the last date of the
+    plan. business_days masks the columns that fall on weekdays.
+    """
+
+    def __init__(self, owners, first_day, matrix):
+        self.owners = owners
+        self.first_day = first_day
+        self.matrix = matrix
+        self.dates = ordinals_to_dates(np.arange(first_day, first_day + matrix.shape[1]))
+        self.business_days = np.is_busday(self.dates)
+
+    def business(self):
+        """Get the weekday dates and the matrix columns of those days"""
+        return self.dates[self.business_days], self.matrix[:, self.business_days]
+
+    def peak(self):
+        """Get the most tasks each resource works on at once on a weekday"""
+        _, matrix = self.business()
+        return matrix.max(axis=1, initial=0)
+
+    def bucket_count(self, granularity):
+        """Number of time buckets with a weekday at a granularity"""
+        keys = _bucket_keys(self.dates[self.business_days], granularity)
+        return int(np.count_nonzero(keys[1:] != keys[:-1])) + 1 if len(keys) else 0
+
+    def auto_granularity(self, max_columns=UTILIZATION_MAX_COLUMNS):
+        """Finest granularity with at most max_columns buckets, or the coarsest one"""
+        for granularity in GRANULARITIES[:-1]:
+            if self.bucket_count(granularity) <= max_columns:
+                return granularity
+        return GRANULARITIES[-1]
+
+    def rollup(self, granularity):
+        """Get the first weekday of each time bucket and the average tasks per weekday in it
+
+        Weeks start on Monday and quarters in January, April, July and
+        October. Buckets are runs of weekday columns with the same key, so
+        their sums come from one np.add.reduceat over the matrix.
+        """
+        dates, matrix = self.business()
+        if granularity == 'day' or len(dates) == 0:
+            return dates, matrix
+
+        keys = _bucket_keys(dates, granularity)
+        starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+        days = np.diff(np.append(starts, len(dates)))
+        return dates[starts], np.add.reduceat(matrix, starts, axis=1) / days
+
+
+def _bucket_keys(dates, granularity):
+    """Number the time bucket of each date, in date order"""
+    if granularity == 'day':
+        return dates.astype(np.int64)
+    if granularity == 'week':
+        # Day 0 of datetime64 is a Thursday, so Mondays are 4 days later
+        return (dates.astype(np.int64) - 4) // 7
+    if granularity == 'month':
+        return dates.astype('datetime64[M]').astype(np.int64)
+    if granularity == 'quarter':
+        return dates.astype('datetime64[M]').astype(np.int64) // 3
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def compute_utilization(store):
+    """Count the tasks of each owner per day, or return None if no task has a date
+
+    Each task adds one to its owner's row from its start day to its finish
+    day. Rather than filling every day of every task, the task boundaries are
+    marked in a difference array with np.add.at and summed along the days.
+    """
+    dates = np.concatenate([store.start[store.start != NO_DATE], store.finish[store.finish != NO_DATE]])
+    if len(dates) == 0:
+        return None
+
+    first_day = int(dates.min())
+    day_count = int(dates.max()) - first_day + 1
+
+    # Tasks finishing before they start cover no days
+    rows = np.flatnonzero(store.has_owner() & store.has_dates() & (store.finish >= store.start))
+    owner_codes = store.owner_codes[rows]
+    changes = np.zeros((len(store.owners), day_count + 1), dtype=np.int64)
+    np.add.at(changes, (owner_codes, store.start[rows] - first_day), 1)
+    np.add.at(changes, (owner_codes, store.finish[rows] - first_day + 1), -1)
+
+    return ResourceUtilization(store.owners, first_day, np.cumsum(changes[:, :-1], axis=1))
+
+def get_utilization(tasks):
+    """Get the resource utilization of a task list, reusing it until the tracked list changes"""
+    if hasattr(tasks, 'derived'):
+        return tasks.derived('utilization', lambda records: compute_utilization(get_task_store(records)))
+    return compute_utilization(get_task_store(tasks))
@@ -2,175 +2,341 @@ import streamlit as st
 import pandas as pd
 import io
 import datetime
+import xlsxwriter
+from openpyxl import load_workbook
+from openpyxl.cell.cell import ERROR_CODES
+from config_py import IMPORT_BATCH_ROWS, IMPORT_ERROR_LIMIT, STREAMING_IMPORT_BYTES, EXPORT_CACHE_ENTRIES
+from auth_py import get_user_store
 from project_py import save_project_data
+from upload_cache_py import get_upload_cache, parsed_size
+from dates_py import parse_date, format_date, format_date_column
+from schema_py import TASK_SCHEMA, MILESTONE_SCHEMA, TASK_COLUMNS, MILESTONE_COLUMNS, format_errors
 
-def parse_date(date_str):
-    """Parse date string in various formats"""
-    if pd.isna(date_str) or date_str == '':
+# Keys of the task and milestone records built from the schema columns
+TASK_KEYS = [
+    'id', 'wbs', 'title', 'description', 'dependencies', 'owner', 'completion',
+    'scheduled_start', 'scheduled_finish', 'actual_start', 'actual_finish', 'finish_variance', 'duration'
+]
+MILESTONE_KEYS = ['id', 'name', 'start_date', 'end_date', 'key_milestone']
+
+# Row of the tasks sheet holding the column headers
+TASK_HEADER_ROW = 4
+
+# Version of the Excel plan parser; bump it whenever its output changes so cached results are not reused
+EXCEL_PARSER_VERSION = 3
+
+# Options reading every sheet cell as stored, so pandas and the streaming reader see the same values
+EXCEL_READ_OPTIONS = {'dtype': object, 'keep_default_na': False, 'na_values': ['']}
+
+# Functions for streaming Excel import
+def _cell_value(value):
+    """Normalize a cell value as pandas does when reading Excel files with EXCEL_READ_OPTIONS"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if value == '' or (isinstance(value, str) and value in ERROR_CODES):
         return None
+    return value
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+def iter_sheet_columns(sheet, schema, header_row=0, batch_size=IMPORT_BATCH_ROWS, progress=None):
+    """Read the columns of a schema from a worksheet in batches of rows
     
-    formats = [
-        '%d/%m/%y', '%d/%m/%Y', '%m/%d/%y', '%m/%d/%Y',
-        '%Y-%m-%d', '%d-%m-%Y', '%m-%d-%Y',
-        '%b %d, %Y', '%B %d, %Y', '%d %b %Y', '%d %B %Y'
-    ]
+    Headers are resolved against the schema once, then each batch is given as
+    a dictionary of Series of cells, one per schema column, indexed by sheet
+    row number, so at most batch_size rows are held at a time. Entirely empty
+    rows are skipped. progress, if given, is called with the number of rows
+    read so far and the number of rows the sheet declares (or None).
+    """
+    rows = sheet.iter_rows(values_only=True)
+    for _ in range(header_row):
+        next(rows, None)
     
-    for fmt in formats:
-        try:
-            return datetime.datetime.strptime(date_str, fmt).date()
-        except ValueError:
+    header = [_cell_value(name) for name in next(rows, None) or ()]
+    compiled = schema.resolve(header)
+    compiled.check()
+    positions = sorted(set(compiled.positions.values()) - {None})
+    
+    rows_total = sheet.max_row - header_row - 1 if sheet.max_row else None
+    rows_read = 0
+    row_numbers = []
+    batch = {position: [] for position in positions}
+    for row in rows:
+        rows_read += 1
+        row = [_cell_value(value) for value in row]
+        if all(_is_missing(value) for value in row):
             continue
+        
+        row_numbers.append(header_row + 1 + rows_read)
+        for position, values in batch.items():
+            values.append(row[position] if position < len(row) else None)
+        
+        if len(row_numbers) >= batch_size:
+            yield compiled.columns(batch, row_numbers)
+            row_numbers = []
+            batch = {position: [] for position in positions}
+            if progress:
+                progress(rows_read, rows_total)
     
-    # If none of the formats match, return None
-    return None
+    if row_numbers:
+        yield compiled.columns(batch, row_numbers)
+    if progress:
+        progress(rows_read, rows_total)
 
-def format_date(date_obj):
-    """Format date object to string"""
-    if date_obj is None:
-        return ''
+def _sheet_progress(progress, label):
+    """Adapt a progress(fraction, text) callback to the row counts of one sheet"""
+    if progress is None:
+        return None
     
-    return date_obj.strftime('%d/%m/%Y')
+    def report(rows_read, rows_total):
+        fraction = min(rows_read / rows_total, 1.0) if rows_total else 0.0
+        progress(fraction, f"Reading {label}: {rows_read:,} rows")
+    
+    return report
 
-# Functions for Excel file processing
-def process_uploaded_excel(upload_file):
-    """Process uploaded Excel file"""
+def stream_tasks(sheet, progress=None, batch_size=IMPORT_BATCH_ROWS):
+    """Read and clean the tasks sheet batch by batch, returning the tasks and the invalid cells"""
+    tasks = []
+    errors = []
+    batches = iter_sheet_columns(sheet, TASK_SCHEMA, TASK_HEADER_ROW, batch_size, _sheet_progress(progress, 'tasks'))
+    for columns in batches:
+        batch_tasks, batch_errors = clean_task_columns(columns, first_id=len(tasks) + 1)
+        tasks.extend(batch_tasks)
+        errors.extend(batch_errors)
+    
+    return tasks, errors
+
+def stream_milestones(sheet, progress=None, batch_size=IMPORT_BATCH_ROWS):
+    """Read and clean the milestones sheet batch by batch, returning the milestones and the invalid cells"""
+    milestones = []
+    errors = []
+    batches = iter_sheet_columns(sheet, MILESTONE_SCHEMA, 0, batch_size, _sheet_progress(progress, 'milestones'))
+    for columns in batches:
+        batch_milestones, batch_errors = clean_milestone_columns(columns, first_id=len(milestones) + 1)
+        milestones.extend(batch_milestones)
+        errors.extend(batch_errors)
+    
+    return milestones, errors
+
+def read_excel_streaming(upload_file, progress=None):
+    """Read tasks, milestones and warnings from a workbook without loading whole sheets into memory
+    
+    Cells are normalized as read_excel_frames reads them, so both readers give
+    the same result for the same workbook.
+    """
+    workbook = load_workbook(upload_file, read_only=True, data_only=True)
     try:
-        # Read Excel file
-        xlsx_data = upload_file.read()
-        
-        # Process with pandas
-        excel_file = io.BytesIO(xlsx_data)
-        
-        # Read first sheet - tasks
-        tasks_df = pd.read_excel(excel_file, sheet_name=0, header=4)
-        
-        # Clean tasks data
-        tasks = []
-        for _, row in tasks_df.iterrows():
-            # Skip empty rows or header rows
-            if pd.isna(row['WBS']) or pd.isna(row['TASK TITLE']) or row['WBS'] == 'WBS':
-                continue
-            
-            task = {
-                'id': str(len(tasks) + 1),
-                'wbs': str(row['WBS']),
-                'title': str(row['TASK TITLE']),
-                'description': str(row['TASK DESCRIPTION']) if not pd.isna(row['TASK DESCRIPTION']) else '',
-                'dependencies': str(row['DEPENDENCIES']) if not pd.isna(row['DEPENDENCIES']) else '',
-                'owner': str(row['TASK OWNER']) if not pd.isna(row['TASK OWNER']) else '',
-                'completion': str(row['PCT OF TASK COMPLETE']) if not pd.isna(row['PCT OF TASK COMPLETE']) else '0%',
-                'scheduled_start': format_date(parse_date(str(row['SCHEDULED START']))) if not pd.isna(row['SCHEDULED START']) else '',
-                'scheduled_finish': format_date(parse_date(str(row['SCHEDULED FINISH']))) if not pd.isna(row['SCHEDULED FINISH']) else '',
-                'actual_start': format_date(parse_date(str(row['ACTUAL START']))) if not pd.isna(row['ACTUAL START']) else '',
-                'actual_finish': format_date(parse_date(str(row['ACTUAL FINISH']))) if not pd.isna(row['ACTUAL FINISH']) else '',
-                'finish_variance': str(row['FINISH VARIANCE']) if not pd.isna(row['FINISH VARIANCE']) else '',
-                'duration': str(row['DURATION']) if not pd.isna(row['DURATION']) else ''
-            }
-            
-            tasks.append(task)
-        
-        # Reset excel file pointer
-        excel_file.seek(0)
+        sheets = workbook.worksheets
+        tasks, errors = stream_tasks(sheets[0], progress)
         
-        # Read second sheet - milestones
+        warnings = []
         try:
-            milestones_df = pd.read_excel(excel_file, sheet_name=1)
-            
-            # Clean milestones data
-            milestones = []
-            for _, row in milestones_df.iterrows():
-                # Skip header row
-                if row['Milestones'] == 'Milestones':
-                    continue
-                
-                milestone = {
-                    'id': str(len(milestones) + 1),
-                    'name': str(row['Milestones']),
-                    'start_date': format_date(parse_date(str(row['Start Date']))) if not pd.isna(row['Start Date']) else '',
-                    'end_date': format_date(parse_date(str(row['End Date']))) if not pd.isna(row['End Date']) else '',
-                    'key_milestone': str(row['Key Milestones']) if not pd.isna(row['Key Milestones']) else ''
-                }
-                
-                milestones.append(milestone)
+            milestones, milestone_errors = stream_milestones(sheets[1], progress)
+            errors += milestone_errors
         except Exception as e:
-            st.warning(f"Error processing milestones: {str(e)}")
+            warnings.append(f"Error processing milestones: {str(e)}")
             milestones = []
+    finally:
+        workbook.close()
+    
+    return tasks, milestones, warnings + error_warnings(errors)
+
+# Functions for Excel file processing
+def _text_column(column, default=''):
+    """Convert a column to strings, using default for missing cells"""
+    return column.map(str).where(column.notna(), default)
+
+def _records(keys, columns):
+    """Build one dictionary per row from equally long columns"""
+    return [dict(zip(keys, values)) for values in zip(*(list(column) for column in columns))]
+
+def clean_task_columns(columns, first_id=1):
+    """Convert columns of task cells into task records, a whole column at a time
+    
+    columns maps each task column name to a Series of cells indexed by row
+    number. Returns the tasks and the cells rejected by the task schema.
+    """
+    # Skip empty rows or header rows
+    wbs = columns['WBS']
+    keep = ~(wbs.isna() | columns['TASK TITLE'].isna() | (wbs == 'WBS')).astype(bool)
+    columns = {name: column[keep] for name, column in columns.items()}
+    parsed, errors = TASK_SCHEMA.parse(columns)
+    
+    tasks = _records(TASK_KEYS, [
+        [str(number) for number in range(first_id, first_id + int(keep.sum()))],
+        columns['WBS'].map(str),
+        columns['TASK TITLE'].map(str),
+        _text_column(columns['TASK DESCRIPTION']),
+        _text_column(columns['DEPENDENCIES']),
+        _text_column(columns['TASK OWNER']),
+        _text_column(columns['PCT OF TASK COMPLETE'], '0%'),
+        format_date_column(parsed['SCHEDULED START']),
+        format_date_column(parsed['SCHEDULED FINISH']),
+        format_date_column(parsed['ACTUAL START']),
+        format_date_column(parsed['ACTUAL FINISH']),
+        _text_column(columns['FINISH VARIANCE']),
+        _text_column(columns['DURATION'])
+    ])
+    return tasks, errors
+
+def clean_milestone_columns(columns, first_id=1):
+    """Convert columns of milestone cells into milestone records and the cells rejected by the milestone schema"""
+    # Skip rows without a milestone name and header rows
+    names = columns['Milestones']
+    keep = ~(names.isna() | (names == 'Milestones')).astype(bool)
+    columns = {name: column[keep] for name, column in columns.items()}
+    parsed, errors = MILESTONE_SCHEMA.parse(columns)
+    
+    milestones = _records(MILESTONE_KEYS, [
+        [str(number) for number in range(first_id, first_id + int(keep.sum()))],
+        columns['Milestones'].map(str),
+        format_date_column(parsed['Start Date']),
+        format_date_column(parsed['End Date']),
+        _text_column(columns['Key Milestones'])
+    ])
+    return milestones, errors
+
+def clean_task_frame(tasks_df, first_id=1, first_row=TASK_HEADER_ROW + 2, schema=None):
+    """Convert a DataFrame of task rows into task records and the invalid cells
+    
+    Rows are numbered from first_row in the error report. schema is the task
+    schema resolved against the DataFrame's headers, resolved here if not given.
+    """
+    schema = schema or TASK_SCHEMA.resolve(tasks_df.columns)
+    schema.check()
+    return clean_task_columns(schema.frame_columns(tasks_df, first_row), first_id)
+
+def clean_milestone_frame(milestones_df, first_row=2):
+    """Convert the milestones sheet of a plan into milestone records and the invalid cells"""
+    schema = MILESTONE_SCHEMA.resolve(milestones_df.columns)
+    schema.check()
+    return clean_milestone_columns(schema.frame_columns(milestones_df, first_row))
+
+def error_warnings(errors):
+    """Summarize the invalid cells of an uploaded plan as import warnings"""
+    if not errors:
+        return []
+    
+    lines = format_errors(errors, IMPORT_ERROR_LIMIT)
+    return [f"{len(errors)} cells could not be read and were left blank or as written:\n" + '\n'.join(lines)]
+
+def read_excel_frames(upload_file):
+    """Read tasks, milestones and warnings from a workbook with pandas
+    
+    Cells are read as stored rather than inferring a type per column, so
+    text such as WBS 1.10 stays text and whole numbers in a column with
+    blanks are not turned into floats.
+    """
+    # Read first sheet - tasks
+    tasks, errors = clean_task_frame(pd.read_excel(upload_file, sheet_name=0, header=TASK_HEADER_ROW, **EXCEL_READ_OPTIONS))
+    
+    # Reset excel file pointer
+    upload_file.seek(0)
+    
+    # Read second sheet - milestones
+    warnings = []
+    try:
+        milestones, milestone_errors = clean_milestone_frame(pd.read_excel(upload_file, sheet_name=1, **EXCEL_READ_OPTIONS))
+        errors += milestone_errors
+    except Exception as e:
+        warnings.append(f"Error processing milestones: {str(e)}")
+        milestones = []
+    
+    return tasks, milestones, warnings + error_warnings(errors)
+
+def parse_excel_plan(data, progress=None):
+    """Parse the bytes of an Excel plan into tasks, milestones and warnings
+    
+    Files of STREAMING_IMPORT_BYTES or more are read with the streaming
+    reader, which reports its progress as progress(fraction, text).
+    """
+    if len(data) >= STREAMING_IMPORT_BYTES:
+        return read_excel_streaming(io.BytesIO(data), progress)
+    return read_excel_frames(io.BytesIO(data))
+
+def process_uploaded_plan(upload_file, parse=parse_excel_plan, parser_version=EXCEL_PARSER_VERSION, progress=None):
+    """Process an uploaded plan file with the given parser"""
+    try:
+        data = upload_file.getvalue()
+        cache = get_upload_cache()
+        upload_key = cache.key(data, parser_version)
+        
+        # The uploader hands back the same file on every rerun, so import it only once per project
+        project = st.session_state.current_project
+        applied = (project['username'], project['project_id'], upload_key)
+        if st.session_state.get('applied_upload') == applied:
+            return True, "File already imported"
+        
+        parsed = cache.get(upload_key)
+        if parsed is None:
+            parsed = parse(data, progress)
+            cache.put(upload_key, parsed, parsed_size(parsed))
+        tasks, milestones, warnings = parsed
+        
+        for warning in warnings:
+            st.warning(warning)
         
-        # Set data in session state
-        st.session_state.tasks = tasks
-        st.session_state.milestones = milestones
+        # Set data in session state, copying the cached records so edits do not reach the cache
+        st.session_state.tasks = [dict(task) for task in tasks]
+        st.session_state.milestones = [dict(milestone) for milestone in milestones]
         
         # Save project data
         save_project_data()
+        st.session_state.applied_upload = applied
         
-        return True, "Excel file processed successfully"
+        return True, f"File processed successfully ({len(tasks)} tasks, {len(milestones)} milestones)"
     except Exception as e:
-        return False, f"Error processing Excel file: {str(e)}"
+        return False, f"Error processing file: {str(e)}"
+
+# Functions for Excel export
+def write_plan_workbook(output, project_name, tasks, milestones, export_date):
+    """Write a project plan workbook row by row in xlsxwriter's constant memory mode"""
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    
+    # Project title and info, then the task header and tasks
+    sheet = workbook.add_worksheet('Sheet1')
+    _write_text_row(sheet, 0, ['PROJECT TITLE', '', project_name, '', 'COMPANY NAME', '', 'Your Company'])
+    _write_text_row(sheet, 1, ['PROJECT MANAGER', '', 'Project Manager', '', 'PROJECT START DATE', '', export_date, '', '0'])
+    _write_text_row(sheet, 4, TASK_COLUMNS)
+    for row, task in enumerate(tasks, start=5):
+        _write_text_row(sheet, row, [task[key] for key in TASK_KEYS[1:]])
+    
+    # Milestones on the second sheet, under a header styled like the one pandas writes
+    sheet = workbook.add_worksheet('Sheet2')
+    if milestones:
+        header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        _write_text_row(sheet, 0, MILESTONE_COLUMNS, header_format)
+    for row, milestone in enumerate(milestones, start=1):
+        _write_text_row(sheet, row, [milestone[key] for key in MILESTONE_KEYS[1:]])
+    
+    workbook.close()
+
+def _write_text_row(sheet, row, values, cell_format=None):
+    for column, value in enumerate(values):
+        if value != '':
+            sheet.write_string(row, column, value, cell_format)
+
+@st.cache_data(max_entries=EXPORT_CACHE_ENTRIES, show_spinner=False)
+def build_excel_export(username, project_id, version, export_date, project_name, _tasks, _milestones):
+    """Build the Excel export of a project, once per project version and export date"""
+    output = io.BytesIO()
+    write_plan_workbook(output, project_name, _tasks, _milestones, export_date)
+    return output.getvalue()
 
 def export_to_excel():
     """Export project data to Excel file"""
     try:
-        # Create a Pandas Excel writer
-        output = io.BytesIO()
-        writer = pd.ExcelWriter(output, engine='xlsxwriter')
-        
-        # Create tasks DataFrame
-        tasks_data = []
-        for task in st.session_state.tasks:
-            tasks_data.append({
-                'WBS': task['wbs'],
-                'TASK TITLE': task['title'],
-                'TASK DESCRIPTION': task['description'],
-                'DEPENDENCIES': task['dependencies'],
-                'TASK OWNER': task['owner'],
-                'PCT OF TASK COMPLETE': task['completion'],
-                'SCHEDULED START': task['scheduled_start'],
-                'SCHEDULED FINISH': task['scheduled_finish'],
-                'ACTUAL START': task['actual_start'],
-                'ACTUAL FINISH': task['actual_finish'],
-                'FINISH VARIANCE': task['finish_variance'],
-                'DURATION': task['duration']
-            })
-            
-        tasks_df = pd.DataFrame(tasks_data)
-        
-        # Create milestones DataFrame
-        milestones_data = []
-        for milestone in st.session_state.milestones:
-            milestones_data.append({
-                'Milestones': milestone['name'],
-                'Start Date': milestone['start_date'],
-                'End Date': milestone['end_date'],
-                'Key Milestones': milestone['key_milestone']
-            })
-        
-        milestones_df = pd.DataFrame(milestones_data)
-        
-        # Write project title and info
-        project_info_df = pd.DataFrame([
-            ['PROJECT TITLE', '', st.session_state.current_project['name'], '', 'COMPANY NAME', '', 'Your Company'],
-            ['PROJECT MANAGER', '', 'Project Manager', '', 'PROJECT START DATE', '', datetime.datetime.now().strftime('%d/%m/%Y'), '', '0']
-        ])
-        
-        # Write Excel file with formatting
-        project_info_df.to_excel(writer, sheet_name='Sheet1', startrow=0, header=False, index=False)
-        
-        # Add header for tasks
-        header_df = pd.DataFrame([['WBS', 'TASK TITLE', 'TASK DESCRIPTION', 'DEPENDENCIES', 'TASK OWNER', 
-                                 'PCT OF TASK COMPLETE', 'SCHEDULED START', 'SCHEDULED FINISH', 
-                                 'ACTUAL START', 'ACTUAL FINISH', 'FINISH VARIANCE', 'DURATION']])
-        header_df.to_excel(writer, sheet_name='Sheet1', startrow=4, header=False, index=False)
-        
-        # Write tasks
-        tasks_df.to_excel(writer, sheet_name='Sheet1', startrow=5, header=False, index=False)
-        
-        # Write milestones to second sheet
-        milestones_df.to_excel(writer, sheet_name='Sheet2', index=False)
-        
-        # Close the Pandas Excel writer and get the output
-        writer.close()
-        
-        return output.getvalue()
+        project = st.session_state.current_project
+        return build_excel_export(
+            project['username'],
+            project['project_id'],
+            get_user_store().version(project['username'], project['project_id']),
+            datetime.datetime.now().strftime('%d/%m/%Y'),
+            project['name'],
+            st.session_state.tasks,
+            st.session_state.milestones
+        )
     except Exception as e:
         st.error(f"Error exporting to Excel: {str(e)}")
-        return None
\ No newline at end of file
+        return None
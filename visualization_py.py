@@ -3,60 +3,41 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from utils_py import parse_date
+from task_store_py import get_task_store, ordinals_to_dates
+from utilization_py import get_utilization
+from metrics_py import get_task_metrics
+from config_py import GANTT_DETAIL_ROWS, GANTT_PAGE_ROWS
 
 # Functions for Gantt chart generation
 def create_gantt_chart(tasks, level=1, parent_wbs=None):
     """Create a Gantt chart from tasks"""
-    # Filter tasks based on WBS level
-    filtered_tasks = []
-    for task in tasks:
-        wbs_parts = task['wbs'].split('.')
-        
-        # Check if task matches the current level and parent WBS
-        if len(wbs_parts) == level and (parent_wbs is None or task['wbs'].startswith(parent_wbs + '.')):
-            filtered_tasks.append(task)
+    store = get_task_store(tasks)
     
-    # Prepare data for Gantt chart
-    gantt_data = []
+    # Filter tasks based on WBS level and parent WBS, keeping those with dates
+    rows = store.wbs_rows(level, parent_wbs)
+    rows = rows[store.has_dates()[rows]]
     
-    for task in filtered_tasks:
-        # Parse dates
-        start_date = parse_date(task['scheduled_start']) or parse_date(task['actual_start'])
-        end_date = parse_date(task['scheduled_finish']) or parse_date(task['actual_finish'])
-        
-        if start_date and end_date:
-            # Calculate completion percentage
-            completion = 0
-            if task['completion'] and task['completion'].strip():
-                try:
-                    completion = float(task['completion'].replace('%', '')) / 100
-                except:
-                    completion = 0
-            
-            # Determine color based on completion
-            if completion >= 1:
-                color = '#4CAF50'  # Completed - Green
-            elif completion > 0:
-                color = '#2196F3'  # In Progress - Blue
-            else:
-                color = '#FF9800'  # Not Started - Orange
-            
-            # Add task to Gantt data
-            gantt_data.append(dict(
-                Task=task['title'],
-                WBS=task['wbs'],
-                Owner=task['owner'],
-                Start=start_date,
-                Finish=end_date,
-                Completion=completion,
-                Color=color
-            ))
-    
-    if not gantt_data:
+    if len(rows) == 0:
         return None
     
+    # Determine color based on completion
+    completion = store.completion[rows]
+    colors = np.select(
+        [completion >= 1, completion > 0],
+        ['#4CAF50', '#2196F3'],  # Completed - Green, In Progress - Blue
+        default='#FF9800'  # Not Started - Orange
+    )
+    
     # Create DataFrame for Gantt chart
-    df = pd.DataFrame(gantt_data)
+    df = pd.DataFrame({
+        'Task': [store.titles[row] for row in rows],
+        'WBS': [store.wbs[row] for row in rows],
+        'Owner': [store.records[row]['owner'] for row in rows],
+        'Start': ordinals_to_dates(store.start[rows]),
+        'Finish': ordinals_to_dates(store.finish[rows]),
+        'Completion': completion,
+        'Color': colors
+    })
     
     # Create Gantt chart with Plotly
     fig = px.timeline(
@@ -73,7 +54,7 @@ def create_gantt_chart(tasks, level=1, parent_wbs=None):
         title="Project Gantt Chart",
         xaxis_title="Date",
         yaxis_title="Tasks",
-        height=max(400, len(gantt_data) * 40),
+        height=max(400, len(df) * 40),
         showlegend=False
     )
     
@@ -82,94 +63,180 @@ def create_gantt_chart(tasks, level=1, parent_wbs=None):
     
     return fig
 
-def create_resource_utilization_chart(tasks):
-    """Create a resource utilization chart"""
-    if not tasks:
+# Functions for the Gantt chart of large plans
+class GanttRows:
+    """Bars of a large-plan Gantt chart, one entry per bar in WBS order
+    
+    Each bar is either a task or a summary of a WBS element whose deeper
+    tasks were collapsed into it, spanning their earliest start to their
+    latest finish with their mean completion.
+    """
+    
+    def __init__(self, wbs, labels, start, finish, completion, counts):
+        self.wbs = wbs
+        self.labels = labels
+        self.start = start
+        self.finish = finish
+        self.completion = completion
+        self.counts = counts
+    
+    def __len__(self):
+        return len(self.wbs)
+    
+    def summaries(self):
+        """WBS of the summary bars, which can be drilled into"""
+        return [wbs for wbs, count in zip(self.wbs, self.counts) if count > 1]
+    
+    def page_count(self, page_size=GANTT_PAGE_ROWS):
+        """Number of pages of page_size bars"""
+        return max(1, -(-len(self) // page_size))
+
+
+def summarize_gantt_rows(store, parent_wbs=None, max_rows=GANTT_DETAIL_ROWS):
+    """Collapse the dated tasks below parent_wbs into at most max_rows bars where possible
+    
+    Tasks are grouped by their WBS prefix at the deepest level that still
+    gives no more than max_rows groups; if even the top level gives more,
+    the top level is used and the bars are paged.
+    """
+    index = store.wbs_index
+    rows = store.wbs_rows(parent_wbs=parent_wbs)
+    rows = rows[store.has_dates()[rows]]
+    wbs_list = [store.wbs[row] for row in rows]
+    top = index.depth_of(parent_wbs) + 1 if parent_wbs else 1
+    deepest = int(store.depth[rows].max()) if len(rows) else top
+    
+    keys = [index.ancestor_at(wbs, top) for wbs in wbs_list]
+    for candidate in range(top + 1, deepest + 1):
+        candidate_keys = [index.ancestor_at(wbs, candidate) for wbs in wbs_list]
+        if len(set(candidate_keys)) > max_rows:
+            break
+        keys = candidate_keys
+    
+    # Aggregate the tasks of each bar
+    codes, bar_wbs = pd.factorize(pd.Series(keys, dtype=object))
+    bar_count = len(bar_wbs)
+    start = np.full(bar_count, np.iinfo(np.int64).max, dtype=np.int64)
+    finish = np.zeros(bar_count, dtype=np.int64)
+    np.minimum.at(start, codes, store.start[rows])
+    np.maximum.at(finish, codes, store.finish[rows])
+    counts = np.bincount(codes, minlength=bar_count)
+    completion = np.bincount(codes, weights=store.completion[rows], minlength=bar_count) / np.maximum(counts, 1)
+    
+    # Label bars with the title of the task at their WBS, if there is one
+    titles = {store.wbs[row]: store.titles[row] for row in rows}
+    labels = [
+        f"{wbs} {titles.get(wbs, '')}".rstrip() + (f" ({count} tasks)" if count > 1 else '')
+        for wbs, count in zip(bar_wbs, counts)
+    ]
+    return GanttRows(list(bar_wbs), labels, start, finish, completion, counts)
+
+def get_gantt_rows(tasks, parent_wbs=None):
+    """Get the bars of the large-plan Gantt chart, reusing them until the tracked list changes"""
+    if hasattr(tasks, 'derived'):
+        return tasks.derived(('gantt_rows', parent_wbs), lambda records: summarize_gantt_rows(get_task_store(records), parent_wbs))
+    return summarize_gantt_rows(get_task_store(tasks), parent_wbs)
+
+def create_large_gantt_chart(tasks, parent_wbs=None, page=1, page_size=GANTT_PAGE_ROWS):
+    """Create one page of the Gantt chart of a large plan with WebGL traces
+    
+    Bars are drawn as thick line segments, one trace per completion status,
+    built directly from arrays, and only the bars of the requested page are
+    included in the figure.
+    """
+    bars = get_gantt_rows(tasks, parent_wbs)
+    if len(bars) == 0:
         return None
     
-    # Get unique resources
-    resources = set()
-    for task in tasks:
-        if task['owner'] and task['owner'].strip():
-            resources.add(task['owner'])
-    
-    # Get date range for the project
-    all_dates = []
-    for task in tasks:
-        start_date = parse_date(task['scheduled_start']) or parse_date(task['actual_start'])
-        end_date = parse_date(task['scheduled_finish']) or parse_date(task['actual_finish'])
+    window = slice((page - 1) * page_size, page * page_size)
+    positions = np.arange(len(bars))[window]
+    starts = ordinals_to_dates(bars.start[window])
+    finishes = ordinals_to_dates(bars.finish[window])
+    completion = bars.completion[window]
+    labels = bars.labels[window]
+    
+    fig = go.Figure()
+    statuses = [
+        ('Completed', '#4CAF50', completion >= 1),
+        ('In Progress', '#2196F3', (completion > 0) & (completion < 1)),
+        ('Not Started', '#FF9800', completion <= 0)
+    ]
+    for name, color, mask in statuses:
+        index = np.flatnonzero(mask)
+        if len(index) == 0:
+            continue
         
-        if start_date:
-            all_dates.append(start_date)
-        if end_date:
-            all_dates.append(end_date)
-    
-    if not all_dates:
-        return None
-    
-    min_date = min(all_dates)
-    max_date = max(all_dates)
+        # Each bar is a segment from start to finish, separated by gaps
+        x = np.empty(len(index) * 3, dtype=object)
+        x[0::3] = starts[index].astype(object)
+        x[1::3] = finishes[index].astype(object)
+        x[2::3] = None
+        y = np.empty(len(index) * 3, dtype=object)
+        y[0::3] = positions[index]
+        y[1::3] = positions[index]
+        y[2::3] = None
+        text = np.repeat([f"{labels[i]}<br>{completion[i]:.0%} complete" for i in index], 3)
+        
+        fig.add_trace(go.Scattergl(
+            x=x,
+            y=y,
+            mode='lines',
+            line=dict(width=14, color=color),
+            name=name,
+            text=text,
+            hoverinfo='text'
+        ))
     
-    # Create date range
-    date_range = pd.date_range(start=min_date, end=max_date)
+    # Update layout
+    fig.update_layout(
+        title="Project Gantt Chart",
+        xaxis_title="Date",
+        yaxis=dict(
+            title="Tasks",
+            tickmode='array',
+            tickvals=positions,
+            ticktext=labels,
+            autorange='reversed'
+        ),
+        height=max(400, len(positions) * 24),
+        showlegend=False
+    )
     
-    # Create resource utilization data
-    utilization_data = {}
-    for resource in resources:
-        utilization_data[resource] = [0] * len(date_range)
+    return fig
+
+def create_resource_utilization_chart(tasks, granularity=None):
+    """Create a resource utilization chart, by day, week, month or quarter
+
+    Without a granularity, the finest one that keeps the heatmap within
+    UTILIZATION_MAX_COLUMNS columns is used, so long plans stay small to draw.
+    """
+    if not tasks:
+        return None
     
-    # Fill utilization data
-    for task in tasks:
-        if not task['owner'] or not task['owner'].strip():
-            continue
-        
-        start_date = parse_date(task['scheduled_start']) or parse_date(task['actual_start'])
-        end_date = parse_date(task['scheduled_finish']) or parse_date(task['actual_finish'])
-        
-        if not start_date or not end_date:
-            continue
-        
-        # Get date range for the task
-        task_dates = pd.date_range(start=start_date, end=end_date)
-        
-        # Increment utilization for each day the resource is working on the task
-        for date in task_dates:
-            if date in date_range:
-                index = (date - min_date).days
-                if index < len(utilization_data[task['owner']]):
-                    utilization_data[task['owner']][index] += 1
-    
-    # Create DataFrame for the chart
-    df_data = []
-    for resource, utilization in utilization_data.items():
-        for i, date in enumerate(date_range):
-            # Skip weekends
-            if date.weekday() >= 5:  # 5=Saturday, 6=Sunday
-                continue
-            
-            df_data.append({
-                'Resource': resource,
-                'Date': date,
-                'Utilization': utilization[i]
-            })
+    utilization = get_utilization(tasks)
+    if utilization is None:
+        return None
     
-    df = pd.DataFrame(df_data)
+    # Skip weekends and roll the days up into time buckets
+    if granularity is None:
+        granularity = utilization.auto_granularity()
+    dates, matrix = utilization.rollup(granularity)
     
     # Create heatmap
-    fig = px.density_heatmap(
-        df,
-        x='Date',
-        y='Resource',
-        z='Utilization',
-        color_continuous_scale='Viridis',
-        title='Resource Utilization'
-    )
+    fig = go.Figure(data=go.Heatmap(
+        x=dates,
+        y=utilization.owners,
+        z=matrix,
+        colorscale='Viridis',
+        colorbar=dict(title='Utilization' if granularity == 'day' else 'Avg. tasks per day')
+    ))
     
     # Update layout
     fig.update_layout(
-        xaxis_title='Date',
+        title='Resource Utilization' if granularity == 'day' else f'Resource Utilization by {granularity.capitalize()}',
+        xaxis_title='Date' if granularity == 'day' else f'{granularity.capitalize()} starting',
         yaxis_title='Resource',
-        height=max(400, len(resources) * 40)
+        height=max(400, len(utilization.owners) * 40)
     )
     
     return fig
@@ -179,30 +246,12 @@ def create_task_completion_chart(tasks):
     if not tasks:
         return None
     
-    # Calculate completion percentages
-    total_tasks = len(tasks)
-    completed_tasks = 0
-    in_progress_tasks = 0
-    not_started_tasks = 0
-    
-    for task in tasks:
-        completion = 0
-        if task['completion'] and task['completion'].strip():
-            try:
-                completion = float(task['completion'].replace('%', '')) / 100
-            except:
-                completion = 0
-        
-        if completion >= 1:
-            completed_tasks += 1
-        elif completion > 0:
-            in_progress_tasks += 1
-        else:
-            not_started_tasks += 1
+    # Task counts by completion status
+    metrics = get_task_metrics(tasks)
     
     # Create pie chart
     labels = ['Completed', 'In Progress', 'Not Started']
-    values = [completed_tasks, in_progress_tasks, not_started_tasks]
+    values = [metrics['completed_tasks'], metrics['in_progress_tasks'], metrics['not_started_tasks']]
     colors = ['#4CAF50', '#2196F3', '#FF9800']
     
     fig = go.Figure(data=[go.Pie(
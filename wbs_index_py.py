@@ -0,0 +1,86 @@
+# WBS hierarchy index
+class WbsIndex:
+    """Tree of the WBS codes of a task list for hierarchy queries
+
+    Every WBS code, and every prefix of one, is a node holding the positions
+    of the tasks with that code and its child nodes. Queries walk only the
+    nodes they return, so they take time proportional to the size of their
+    result. Task positions are given in task list order, except for
+    ancestors, which are given from the top level down.
+    """
+
+    def __init__(self, wbs_list):
+        self._positions = {}
+        self._children = {_ROOT: []}
+        self._paths = {}
+        self._levels = {}
+        self.depths = []
+        for position, wbs in enumerate(wbs_list):
+            path = self._paths.get(wbs)
+            if path is None:
+                path = self._add_node(wbs)
+            self._positions.setdefault(wbs, []).append(position)
+            self._levels.setdefault(len(path), []).append(position)
+            self.depths.append(len(path))
+
+    def _add_node(self, wbs):
+        """Add a WBS code and its missing ancestors, returning its path of prefixes"""
+        path = _wbs_path(wbs)
+        parent = _ROOT
+        for depth, prefix in enumerate(path, start=1):
+            if prefix not in self._paths:
+                self._paths[prefix] = path[:depth]
+                self._children[prefix] = []
+                self._children[parent].append(prefix)
+            parent = prefix
+        return path
+
+    def depth_of(self, wbs):
+        """Depth of a WBS code, 1 for top-level codes"""
+        path = self._paths.get(wbs)
+        return len(path) if path is not None else len(wbs.split('.'))
+
+    def level(self, depth):
+        """Positions of the tasks at a WBS depth"""
+        return list(self._levels.get(depth, []))
+
+    def children(self, wbs=None):
+        """Positions of the tasks directly below a WBS code, or of the top-level tasks"""
+        if wbs is None:
+            return self.level(1)
+        return sorted(position for child in self._children.get(wbs, []) for position in self._positions.get(child, []))
+
+    def descendants(self, wbs=None, depth=None):
+        """Positions of the tasks anywhere below a WBS code, optionally only those at a depth"""
+        if wbs is None:
+            return self.level(depth) if depth is not None else list(range(len(self.depths)))
+
+        positions = []
+        pending = list(self._children.get(wbs, []))
+        while pending:
+            node = pending.pop()
+            node_depth = len(self._paths[node])
+            if depth is None or node_depth == depth:
+                positions.extend(self._positions.get(node, []))
+            if depth is None or node_depth < depth:
+                pending.extend(self._children[node])
+        return sorted(positions)
+
+    def ancestors(self, wbs):
+        """Positions of the tasks above a WBS code, from the top level down"""
+        path = self._paths.get(wbs) or _wbs_path(wbs)
+        return [position for prefix in path[:-1] for position in self._positions.get(prefix, [])]
+
+    def ancestor_at(self, wbs, depth):
+        """WBS code of the ancestor of a code at a depth, or the code itself if it is not deeper"""
+        path = self._paths[wbs]
+        return path[depth - 1] if depth < len(path) else wbs
+
+
+# Key of the root node, which no WBS code can collide with, not even an empty one
+_ROOT = None
+
+def _wbs_path(wbs):
+    """Prefixes of a WBS code, from its top-level code to the code itself"""
+    parts = wbs.split('.')
+    return tuple('.'.join(parts[:length]) for length in range(1, len(parts) + 1))
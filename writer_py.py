@@ -0,0 +1,173 @@
+import atexit
+import logging
+import threading
+
+from config_py import WRITE_COALESCE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Background persistence
+class BackgroundWriter:
+    """Wrap a storage backend so that saves run on a dedicated writer thread
+
+    Saves return immediately. Requests for the same user or project that
+    arrive while a write is pending are merged, and the writer waits a short
+    coalescing window before flushing, so a burst of edits costs one write.
+    flush() blocks until everything queued so far is on disk.
+    """
+
+    def __init__(self, storage, lock_for=None, delay=WRITE_COALESCE_SECONDS):
+        self.storage = storage
+        self.lock_for = lock_for
+        self.delay = delay
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._busy = False
+        self._flushing = 0
+        self._errors = []
+        self.stats = {'requested': 0, 'written': 0, 'batches': 0}
+        self._thread = threading.Thread(target=self._run, name='storage-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self._flush_at_exit)
+
+    def __getattr__(self, name):
+        # Anything else (load_project_items, close, ...) goes straight to the backend
+        return getattr(self.storage, name)
+
+    def load_users(self):
+        """Load the users dictionary once pending writes are on disk"""
+        self.flush()
+        return self.storage.load_users()
+
+    def save_users(self, users):
+        """Queue a save of the whole users dictionary"""
+        self._submit(('all',), users, None)
+
+    def save_user(self, users, username):
+        """Queue a save of a user record"""
+        self._submit(('user', username), users, None)
+
+    def save_project(self, users, username, project_id, changes=None):
+        """Queue a save of a project, merging it with a pending save of the same project"""
+        self._submit(('project', username, project_id), users, changes)
+
+    def save_projects(self, users, username, project_ids):
+        """Queue a batched save of several projects of a user"""
+        self._submit(('projects', username, tuple(project_ids)), users, None)
+
+    def flush(self):
+        """Block until every queued save has been written, re-raising the first failure"""
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                self._cond.wait_for(lambda: not self._pending and not self._busy)
+            finally:
+                self._flushing -= 1
+        errors = self.take_errors()
+        if errors:
+            raise errors[0]
+
+    def _flush_at_exit(self):
+        """Write what is still queued at interpreter exit, logging failures instead of raising them"""
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error("Error saving user data at exit: %s", e)
+        for error in self.take_errors():
+            logger.error("Error saving user data at exit: %s", error)
+
+    def take_errors(self):
+        """Get and clear the errors raised by background writes"""
+        with self._cond:
+            errors, self._errors = self._errors, []
+        return errors
+
+    def _submit(self, key, users, changes):
+        with self._cond:
+            self.stats['requested'] += 1
+            if ('all',) in self._pending:
+                # A pending full save already covers this one
+                return
+            if key == ('all',):
+                self._pending.clear()
+            elif key in self._pending:
+                changes = _merge_changes(self._pending[key][1], changes)
+            self._pending[key] = (users, changes)
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                # Let a burst of edits accumulate unless someone is waiting on a flush
+                self._cond.wait_for(lambda: self._flushing, timeout=self.delay)
+                batch, self._pending = self._pending, {}
+                self._busy = True
+
+            for key, (users, changes) in batch.items():
+                try:
+                    self._write(key, users, changes)
+                except Exception as e:
+                    with self._cond:
+                        self._errors.append(e)
+
+            with self._cond:
+                self._busy = False
+                self.stats['batches'] += 1
+                self.stats['written'] += len(batch)
+                self._cond.notify_all()
+
+    def _write(self, key, users, changes):
+        for attempt in range(3):
+            try:
+                return self._write_once(key, users, changes)
+            except RuntimeError:
+                # Another session changed the dictionary while it was being serialized
+                if attempt == 2:
+                    raise
+
+    def _write_once(self, key, users, changes):
+        if key[0] == 'all':
+            return self.storage.save_users(users)
+
+        username = key[1]
+        lock = self.lock_for(username) if self.lock_for is not None else threading.Lock()
+        with lock:
+            if key[0] == 'user':
+                self.storage.save_user(users, username)
+            elif key[0] == 'projects':
+                self.storage.save_projects(users, username, list(key[2]))
+            else:
+                project_id = key[2]
+                changes = _clip_changes(changes, users[username]['projects'][project_id])
+                self.storage.save_project(users, username, project_id, changes)
+
+
+def _merge_changes(first, second):
+    """Merge two project changes dictionaries; None means the whole project"""
+    if first is None or second is None:
+        return None
+    merged = {'meta': bool(first.get('meta')) or bool(second.get('meta'))}
+    for key in set(first) | set(second):
+        if key == 'meta':
+            continue
+        if key not in first or key not in second:
+            merged[key] = first.get(key) or second.get(key)
+            continue
+        positions = set(first[key][0]) | set(second[key][0])
+        merged[key] = (sorted(positions), second[key][1])
+    return merged
+
+def _clip_changes(changes, project):
+    """Drop changed positions that no longer exist because records were removed since"""
+    if changes is None:
+        return None
+    clipped = dict(changes)
+    for key, value in changes.items():
+        if key == 'meta':
+            continue
+        positions, _ = value
+        length = len(project.get(key, []))
+        clipped[key] = ([position for position in positions if position < length], length)
+    return clipped